@@ -3,7 +3,6 @@
 from __future__ import annotations
 
 import logging
-import os
 
 from attr import dataclass
 from TISControlProtocol.api import *
@@ -12,12 +11,26 @@ from TISControlProtocol.Protocols.udp.ProtocolHandler import TISProtocolHandler
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import Platform
 from homeassistant.core import HomeAssistant
-
-from .const import DEVICES_DICT, DOMAIN
-from . import tis_configuration_dashboard
-import aiofiles
-import ruamel.yaml
-import io
+import homeassistant.helpers.config_validation as cv
+from homeassistant.helpers.typing import ConfigType
+
+from .catalog import EntityCatalog
+from .channels import ChannelStateStore
+from .commands import PacketCache
+from .configuration_yaml import async_patch_configuration
+from .const import (
+    CONF_MAX_FRAME_RATE,
+    CONF_WRITE_FLUSH_WINDOW,
+    DEFAULT_MAX_FRAME_RATE,
+    DEFAULT_WRITE_FLUSH_WINDOW,
+    DEVICES_DICT,
+    DOMAIN,
+)
+from .dispatcher import FeedbackDispatcher
+from .scheduler import SendScheduler
+from .services import async_setup_services
+from .snapshot import StateSnapshot
+from .state_writer import StateWriteCoalescer
 
 
 @dataclass
@@ -25,6 +38,13 @@ class TISData:
     """TISControl data stored in the ConfigEntry."""
 
     api: TISApi
+    catalog: EntityCatalog
+    dispatcher: FeedbackDispatcher
+    channel_states: ChannelStateStore
+    state_writer: StateWriteCoalescer
+    send_scheduler: SendScheduler
+    packet_cache: PacketCache
+    snapshot: StateSnapshot
 
 
 PLATFORMS: list[Platform] = [
@@ -40,37 +60,19 @@ PLATFORMS: list[Platform] = [
 ]
 type TISConfigEntry = ConfigEntry[TISData]
 protocol_handler = TISProtocolHandler()
+CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
 
 
-async def async_setup_entry(hass: HomeAssistant, entry: TISConfigEntry) -> bool:
-    """Set up TISControl from a config entry."""
-
-    tis_configuration_dashboard.create()
-
-    current_dir = os.path.dirname(__file__)
-    base_dir = os.path.abspath(os.path.join(current_dir, "../../"))
-    config_path = os.path.join(base_dir, "configuration.yaml")
-
-    yaml = ruamel.yaml.YAML()
-
-    async with aiofiles.open(config_path, "r") as f:
-        contents = await f.read()
-
-    config_data = await hass.async_add_executor_job(yaml.load, contents)
-
-    http_settings = {"use_x_forwarded_for": True, "trusted_proxies": ["172.30.33.0/24"]}
+async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
+    """Set up the TISControl services."""
+    async_setup_services(hass)
+    return True
 
-    if "http" not in config_data or config_data["http"] != http_settings:
-        logging.warning("Adding HTTP configuration to configuration.yaml")
-        config_data["http"] = http_settings
 
-        buffer = io.StringIO()
-        await hass.async_add_executor_job(yaml.dump, config_data, buffer)
+async def async_setup_entry(hass: HomeAssistant, entry: TISConfigEntry) -> bool:
+    """Set up TISControl from a config entry."""
 
-        async with aiofiles.open(config_path, "w") as f:
-            await f.write(buffer.getvalue())
-    else:
-        logging.info("HTTP configuration already exists in configuration.yaml")
+    await async_patch_configuration(hass)
 
     tis_api = TISApi(
         port=int(entry.data["port"]),
@@ -79,7 +81,23 @@ async def async_setup_entry(hass: HomeAssistant, entry: TISConfigEntry) -> bool:
         devices_dict=DEVICES_DICT,
         display_logo="./custom_components/tis_integration/images/logo.png",
     )
-    entry.runtime_data = TISData(api=tis_api)
+    channel_states = ChannelStateStore(hass)
+    snapshot = StateSnapshot(hass, entry.entry_id, channel_states)
+    await snapshot.async_load()
+    catalog = await EntityCatalog.async_load(tis_api)
+    for device_id, channels in catalog.channels().items():
+        channel_states.add_device(device_id, channels)
+    entry.runtime_data = TISData(
+        api=tis_api,
+        catalog=catalog,
+        dispatcher=FeedbackDispatcher(hass, channel_states),
+        channel_states=channel_states,
+        state_writer=StateWriteCoalescer(hass, _flush_window(entry)),
+        send_scheduler=SendScheduler(hass, tis_api, _max_frame_rate(entry)),
+        packet_cache=PacketCache(),
+        snapshot=snapshot,
+    )
+    entry.async_on_unload(entry.add_update_listener(async_update_options))
 
     hass.data.setdefault(DOMAIN, {"supported_platforms": PLATFORMS})
     try:
@@ -92,9 +110,31 @@ async def async_setup_entry(hass: HomeAssistant, entry: TISConfigEntry) -> bool:
     return True
 
 
+def _flush_window(entry: TISConfigEntry) -> float:
+    """Return the state write flush window in seconds."""
+    return (
+        entry.options.get(CONF_WRITE_FLUSH_WINDOW, DEFAULT_WRITE_FLUSH_WINDOW) / 1000
+    )
+
+
+def _max_frame_rate(entry: TISConfigEntry) -> int:
+    """Return the frame rate cap per gateway in frames per second."""
+    return entry.options.get(CONF_MAX_FRAME_RATE, DEFAULT_MAX_FRAME_RATE)
+
+
+async def async_update_options(hass: HomeAssistant, entry: TISConfigEntry) -> None:
+    """Apply updated options."""
+    entry.runtime_data.state_writer.window = _flush_window(entry)
+    entry.runtime_data.send_scheduler.max_frame_rate = _max_frame_rate(entry)
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: TISConfigEntry) -> bool:
     """Unload a config entry."""
     if unload_ok := await hass.config_entries.async_unload_platforms(entry, PLATFORMS):
+        entry.runtime_data.dispatcher.async_stop()
+        entry.runtime_data.state_writer.async_stop()
+        entry.runtime_data.send_scheduler.async_stop()
+        await entry.runtime_data.snapshot.async_save()
         return unload_ok
 
     return False
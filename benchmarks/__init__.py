@@ -0,0 +1 @@
+"""Benchmarks for the TIS Control integration."""
@@ -0,0 +1,550 @@
+"""Measure how feedback handling scales with the number of TIS entities.
+
+Builds N lights, switches, binary sensors, energy sensors, covers or ACs
+against a stub event bus and a stub TISApi, replays synthetic feedback
+packets through the feedback dispatcher and reports handler latency,
+throughput and memory per entity, optionally per feedback type. Nothing
+is sent on the network, state writes are counted instead of reaching a
+state machine. Every packet addresses one device, so running several
+channel counts shows the cost of a packet against the number of
+channels, and entities, of the device it reaches. A handler that is a
+coroutine starts eagerly like on the Home Assistant bus, the part after
+its first await only shows in events/s.
+
+Run it from the directory containing the integration, with the
+integration requirements and homeassistant installed:
+
+    python -m tis_integration.benchmarks.entity_scaling --entities 500
+    python -m tis_integration.benchmarks.entity_scaling --rate 2000 --json
+    python -m tis_integration.benchmarks.entity_scaling --kinds light switch \
+        --channels 4 8 24 48 96 --feedback binary_feedback
+
+To catch a handler latency regression, save a run of the old code and
+compare a run of the new code against it:
+
+    python -m tis_integration.benchmarks.entity_scaling --json > before.json
+    python -m tis_integration.benchmarks.entity_scaling --per-feedback \
+        --compare before.json
+
+The old code may predate the feedback dispatcher: copy the benchmarks
+directory into its tree and run it there. Modules the tree lacks are
+left out of the runtime data and its entities listen on the bus directly.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+from collections import defaultdict
+from dataclasses import dataclass
+import importlib
+import json
+import random
+import statistics
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+import attr
+
+from homeassistant.const import MATCH_ALL, UnitOfTemperature
+from homeassistant.core import Event
+from homeassistant.util.async_ import create_eager_task
+
+from .. import TISData, sensor
+from ..binary_sensor import TISBinarySensor
+from ..climate import TISClimate
+from ..const import FAN_MODES, TEMPERATURE_RANGES
+from ..cover import TISCoverWPos
+from ..light import TISLight
+from ..switch import TISSwitch
+
+
+def _optional(module: str, name: str):
+    """Return a class of an integration module, None when the tree lacks it."""
+    try:
+        return getattr(importlib.import_module(f"..{module}", __package__), name)
+    except (ImportError, AttributeError):
+        return None
+
+
+EntityCatalog = _optional("catalog", "EntityCatalog")
+ChannelStateStore = _optional("channels", "ChannelStateStore")
+PacketCache = _optional("commands", "PacketCache")
+FeedbackDispatcher = _optional("dispatcher", "FeedbackDispatcher")
+SendScheduler = _optional("scheduler", "SendScheduler")
+StateWriteCoalescer = _optional("state_writer", "StateWriteCoalescer")
+
+KINDS = ("light", "switch", "binary_sensor", "energy_sensor", "cover", "climate")
+LIGHT_FEEDBACK_TYPES = ("control_response", "update_response", "binary_feedback")
+ENERGY_READING = {key: 230.0 for key in ("v1", "v2", "v3", "total_power")}
+# values an AC reports for its fan speed and mode
+AC_FAN_SPEEDS = sorted(set(FAN_MODES.values()))
+AC_MODES = sorted(
+    {settings["packet_mode_index"] for settings in TEMPERATURE_RANGES.values()}
+)
+
+
+class StubBus:
+    """Event bus delivering events synchronously to its listeners."""
+
+    def __init__(self) -> None:
+        """Initialize the bus."""
+        self._listeners: defaultdict[str, list] = defaultdict(list)
+
+    def async_listen(self, event_type: str, listener):
+        """Register a listener, return its remover."""
+        self._listeners[event_type].append(listener)
+        return lambda: self._listeners[event_type].remove(listener)
+
+    def async_fire(self, event_type: str, event_data: dict) -> None:
+        """Deliver an event to the listeners of its type."""
+        event = Event(event_type, event_data)
+        for listener in (*self._listeners[event_type], *self._listeners[MATCH_ALL]):
+            if asyncio.iscoroutine(result := listener(event)):
+                create_eager_task(result)
+
+
+class StubHass:
+    """The parts of HomeAssistant the entities use while handling feedback."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Initialize the stub."""
+        self.loop = loop
+        self.bus = StubBus()
+        self.data: dict = {}
+        self.config = SimpleNamespace(
+            units=SimpleNamespace(temperature_unit=UnitOfTemperature.CELSIUS)
+        )
+        self.states = SimpleNamespace(get=lambda entity_id: None)
+
+    def async_run_hass_job(self, job, *args):
+        """Run a job, starting it eagerly when it is a coroutine function."""
+        result = job.target(*args)
+        if asyncio.iscoroutine(result):
+            return create_eager_task(result, loop=self.loop)
+        return result
+
+
+class StubSender:
+    """Sender acknowledging every packet without sending it."""
+
+    def __init__(self) -> None:
+        """Initialize the sender."""
+        self.sent = 0
+
+    async def send_packet(self, packet) -> bool:
+        """Count a packet."""
+        self.sent += 1
+        return True
+
+    async def send_packet_with_ack(self, packet, *args, **kwargs) -> bool:
+        """Count a packet and acknowledge it."""
+        self.sent += 1
+        return True
+
+
+class StubApi:
+    """TISApi replacement holding what entities read from it."""
+
+    def __init__(self) -> None:
+        """Initialize the api."""
+        self.host = "127.0.0.1"
+        self.bill_configs: dict = {}
+        self.protocol = SimpleNamespace(sender=StubSender())
+
+
+class StubCoordinator:
+    """Coordinator that never polls."""
+
+    data = None
+    last_update_success = True
+
+    def async_add_listener(self, update_callback, context=None):
+        """Register nothing, return a remover."""
+        return lambda: None
+
+
+class StubSnapshot:
+    """Snapshot restoring nothing, it counts the entity states saved."""
+
+    def __init__(self) -> None:
+        """Initialize the snapshot."""
+        self.saves = 0
+
+    def entity_state(self, unique_id: str) -> None:
+        """Return no saved state."""
+        return None
+
+    def async_set_entity_state(self, unique_id: str, state: dict) -> None:
+        """Count a saved state."""
+        self.saves += 1
+
+
+@dataclass
+class Result:
+    """Measurements of one entity kind."""
+
+    kind: str
+    channels: int
+    entities: int
+    packets: int
+    p50_us: float
+    p99_us: float
+    events_per_second: float
+    bytes_per_entity: float
+    state_writes: int
+    # packets, p50_us and p99_us of every feedback type
+    per_feedback: dict[str, dict[str, float]]
+
+
+def _device_id(index: int) -> list[int]:
+    return [1 + index // 250, 1 + index % 250]
+
+
+def build_entities(
+    kind: str, count: int, channels: int, hass: StubHass, api: StubApi
+) -> list:
+    """Create count entities of a kind, channels per device."""
+    entities = []
+    for index in range(count):
+        device_id = _device_id(index // channels)
+        channel = index % channels + 1
+        name = f"bench {kind} {index}"
+        if kind == "light":
+            entity = TISLight(api, "gw", name, channel, device_id)
+        elif kind == "switch":
+            entity = TISSwitch(api, name, channel, device_id, "gw")
+        elif kind == "binary_sensor":
+            entity = TISBinarySensor(api, name, channel, device_id, "gw")
+        elif kind == "cover":
+            entity = TISCoverWPos(api, "gw", name, channel, device_id, None)
+        elif kind == "climate":
+            entity = TISClimate(api, name, channel, device_id, "gw")
+        else:
+            entity = sensor.CoordinatedEnergySensor(
+                hass, api, "gw", name, device_id, channel, "v1", "energy_sensor"
+            )
+        entities.append(entity)
+    return entities
+
+
+def synthetic_feedback(
+    kind: str,
+    devices: int,
+    channels: int,
+    feedback_types: list[str],
+    rng: random.Random,
+) -> tuple[str, dict]:
+    """Return the event type and data of a synthetic feedback packet."""
+    device_id = _device_id(rng.randrange(devices))
+    channel = rng.randint(1, channels)
+    level = rng.choice((0, 100, rng.randint(1, 99)))
+    if kind in ("light", "switch", "cover"):
+        feedback_type = rng.choice(feedback_types)
+        if feedback_type == "control_response":
+            data = {"channel_number": channel, "additional_bytes": [channel, 0, level]}
+        elif feedback_type == "update_response":
+            levels = [rng.choice((0, 100)) for _ in range(channels)]
+            data = {
+                "channel_number": channels,
+                "additional_bytes": [channels, *levels],
+            }
+        else:
+            bitmap = rng.getrandbits(channels)
+            data = {
+                "additional_bytes": [
+                    channels,
+                    *bitmap.to_bytes(-(-channels // 8), "little"),
+                ]
+            }
+    elif kind == "binary_sensor":
+        feedback_type = "realtime_feedback"
+        data = {"channel_number": channel, "additional_bytes": [channel, level]}
+    elif kind == "climate":
+        # the AC number of a climate entity counts from 0
+        if rng.random() < 0.5:
+            feedback_type = "ac_feedback"
+            sub_operation = rng.randint(0x03, 0x08)
+            data = {
+                "number": channel - 1,
+                "sub_operation": sub_operation,
+                "operation_value": _ac_value(sub_operation, rng),
+            }
+        else:
+            feedback_type = "update_feedback"
+            data = {
+                "ac_number": channel - 1,
+                "state": rng.choice((0, 1)),
+                "hvac_mode": rng.choice(AC_MODES),
+                "fan_speed": rng.choice(AC_FAN_SPEEDS),
+                "cool_temp": rng.randint(16, 30),
+                "heat_temp": rng.randint(16, 30),
+                "auto_temp": rng.randint(16, 30),
+            }
+    else:
+        feedback_type = "energy_feedback"
+        reading = {key: value + rng.random() for key, value in ENERGY_READING.items()}
+        data = {"channel_num": channel, "energy": reading}
+    data.update(device_id=device_id, feedback_type=feedback_type)
+    return str(device_id), data
+
+
+def _ac_value(sub_operation: int, rng: random.Random) -> int:
+    """Return a value an AC reports with an ac_feedback sub operation."""
+    if sub_operation == 0x03:
+        return rng.choice((0, 1))
+    if sub_operation == 0x05:
+        return rng.choice(AC_FAN_SPEEDS)
+    if sub_operation == 0x06:
+        return rng.choice(AC_MODES)
+    return rng.randint(16, 30)
+
+
+def _percentiles(latencies: list[float]) -> tuple[float, float]:
+    """Return the p50 and p99 of latencies in seconds, in microseconds."""
+    latencies.sort()
+    return (
+        statistics.median(latencies) * 1e6,
+        latencies[int(len(latencies) * 0.99)] * 1e6,
+    )
+
+
+def stub_runtime_data(
+    hass: StubHass,
+    api: StubApi,
+    flush_window: float,
+    dispatcher_class: type[FeedbackDispatcher] | None = None,
+) -> TISData:
+    """Return the runtime data of a config entry built on the stubs.
+
+    Only the fields TISData has in the tree being measured are filled.
+    """
+    dispatcher_class = dispatcher_class or FeedbackDispatcher
+    channel_states = ChannelStateStore(hass) if ChannelStateStore else None
+    data = {
+        "api": api,
+        "catalog": EntityCatalog({}) if EntityCatalog else None,
+        "dispatcher": (
+            dispatcher_class(hass, channel_states) if dispatcher_class else None
+        ),
+        "channel_states": channel_states,
+        "state_writer": (
+            StateWriteCoalescer(hass, flush_window) if StateWriteCoalescer else None
+        ),
+        "send_scheduler": SendScheduler(hass, api) if SendScheduler else None,
+        "packet_cache": PacketCache() if PacketCache else None,
+        "snapshot": StubSnapshot(),
+    }
+    fields = {field.name for field in attr.fields(TISData)}
+    return TISData(**{name: value for name, value in data.items() if name in fields})
+
+
+async def async_add_entities(
+    kind: str, entities: list, hass: StubHass, runtime_data: TISData, write
+) -> None:
+    """Add entities like their platform would, write replaces their state writes."""
+    config_entry = SimpleNamespace(
+        runtime_data=runtime_data,
+        async_create_background_task=lambda hass, target, name: hass.loop.create_task(
+            target, name=name
+        ),
+    )
+    platform = SimpleNamespace(config_entry=config_entry)
+
+    async def async_update_ha_state(force_refresh: bool = False) -> None:
+        write()
+
+    for index, entity in enumerate(entities):
+        entity.hass = hass
+        entity.platform = platform
+        entity.entity_id = f"{kind}.bench_{index}"
+        entity.async_write_ha_state = write
+        entity.async_update_ha_state = async_update_ha_state
+        await entity.async_added_to_hass()
+
+
+async def _run_kind(kind: str, channels: int, args: argparse.Namespace) -> Result:
+    hass = StubHass(asyncio.get_running_loop())
+    api = StubApi()
+    runtime_data = stub_runtime_data(hass, api, args.flush_window / 1000)
+    writes = 0
+
+    def count_write() -> None:
+        nonlocal writes
+        writes += 1
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    entities = build_entities(kind, args.entities, channels, hass, api)
+    await async_add_entities(kind, entities, hass, runtime_data, count_write)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    allocated = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+
+    rng = random.Random(args.seed)
+    devices = -(-args.entities // channels)
+    packets = [
+        synthetic_feedback(kind, devices, channels, args.feedback, rng)
+        for _ in range(args.packets)
+    ]
+    interval = 1 / args.rate if args.rate else 0
+    latencies = []
+    per_feedback: defaultdict[str, list[float]] = defaultdict(list)
+    fire = hass.bus.async_fire
+    perf_counter = time.perf_counter
+    started = next_at = perf_counter()
+    for event_type, data in packets:
+        if interval:
+            next_at += interval
+            if (delay := next_at - perf_counter()) > 0:
+                await asyncio.sleep(delay)
+        begin = perf_counter()
+        fire(event_type, data)
+        latency = perf_counter() - begin
+        latencies.append(latency)
+        per_feedback[data["feedback_type"]].append(latency)
+        if not interval:
+            # let coalesced writes flush like they would between packets
+            await asyncio.sleep(0)
+    await asyncio.sleep(args.flush_window / 1000)
+    await asyncio.sleep(0)
+    elapsed = perf_counter() - started
+
+    p50, p99 = _percentiles(latencies)
+    return Result(
+        kind=kind,
+        channels=channels,
+        entities=args.entities,
+        packets=args.packets,
+        p50_us=p50,
+        p99_us=p99,
+        events_per_second=args.packets / elapsed,
+        bytes_per_entity=allocated / args.entities,
+        state_writes=writes,
+        per_feedback={
+            feedback_type: dict(
+                zip(("packets", "p50_us", "p99_us"), (len(times), *_percentiles(times)))
+            )
+            for feedback_type, times in sorted(per_feedback.items())
+        },
+    )
+
+
+async def _run(args: argparse.Namespace) -> list[Result]:
+    # energy sensors poll through a coordinator, they get one that never runs
+    sensor.get_coordinator = lambda *args, **kwargs: StubCoordinator()
+    return [
+        await _run_kind(kind, channels, args)
+        for channels in args.channels
+        for kind in args.kinds
+    ]
+
+
+def main() -> None:
+    """Run the benchmark and print the results."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entities", type=int, default=200, help="per kind")
+    parser.add_argument("--packets", type=int, default=20000, help="per kind")
+    parser.add_argument(
+        "--rate", type=float, default=0, help="packets per second, 0 is unpaced"
+    )
+    parser.add_argument("--flush-window", type=int, default=0, help="ms")
+    parser.add_argument(
+        "--kinds",
+        nargs="+",
+        default=["light", "switch", "binary_sensor", "energy_sensor"],
+        choices=KINDS,
+    )
+    parser.add_argument(
+        "--channels", nargs="+", type=int, default=[24], help="per device"
+    )
+    parser.add_argument(
+        "--feedback",
+        nargs="+",
+        default=list(LIGHT_FEEDBACK_TYPES),
+        choices=LIGHT_FEEDBACK_TYPES,
+        help="feedback types sent to lights, switches and covers",
+    )
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true", help="print JSON lines")
+    parser.add_argument(
+        "--per-feedback", action="store_true", help="latency per feedback type"
+    )
+    parser.add_argument(
+        "--compare", metavar="FILE", help="JSON lines of an earlier run to compare"
+    )
+    args = parser.parse_args()
+
+    results = asyncio.run(_run(args))
+    if args.json:
+        for result in results:
+            print(json.dumps(result.__dict__))
+        return
+    print(
+        f"{'kind':<14}{'channels':>9}{'entities':>9}{'p50 us':>9}{'p99 us':>9}"
+        f"{'events/s':>11}{'B/entity':>10}{'writes':>9}"
+    )
+    for result in results:
+        print(
+            f"{result.kind:<14}{result.channels:>9}{result.entities:>9}"
+            f"{result.p50_us:>9.1f}{result.p99_us:>9.1f}"
+            f"{result.events_per_second:>11.0f}{result.bytes_per_entity:>10.0f}"
+            f"{result.state_writes:>9}"
+        )
+    if args.per_feedback:
+        print(f"\n{'kind':<14}{'feedback':<22}{'packets':>9}{'p50 us':>9}{'p99 us':>9}")
+        for result in results:
+            for feedback_type, stats in result.per_feedback.items():
+                print(
+                    f"{result.kind:<14}{feedback_type:<22}{stats['packets']:>9}"
+                    f"{stats['p50_us']:>9.1f}{stats['p99_us']:>9.1f}"
+                )
+    if args.compare:
+        _print_comparison(results, args.compare, args.per_feedback)
+
+
+def _print_comparison(results: list[Result], path: str, per_feedback: bool) -> None:
+    """Print the latency and throughput of results next to an earlier run."""
+    with open(path, encoding="utf-8") as file:
+        earlier = {
+            (run["kind"], run.get("channels"), run["entities"]): run
+            for run in map(json.loads, file)
+        }
+    print(
+        f"\n{'kind':<14}{'feedback':<22}{'p50 before':>11}{'after':>9}"
+        f"{'p99 before':>11}{'after':>9}{'p50 change':>11}"
+        f"{'events/s before':>16}{'after':>9}"
+    )
+    for result in results:
+        before = earlier.get((result.kind, result.channels, result.entities))
+        if before is None:
+            continue
+        rows = [("all", before, result.__dict__)]
+        if per_feedback:
+            rows.extend(
+                (
+                    feedback_type,
+                    before.get("per_feedback", {}).get(feedback_type),
+                    stats,
+                )
+                for feedback_type, stats in result.per_feedback.items()
+            )
+        for feedback_type, old, new in rows:
+            if old is None:
+                continue
+            change = (new["p50_us"] / old["p50_us"] - 1) * 100
+            throughput = (
+                f"{old['events_per_second']:>16.0f}{new['events_per_second']:>9.0f}"
+                if "events_per_second" in old
+                else ""
+            )
+            print(
+                f"{result.kind:<14}{feedback_type:<22}{old['p50_us']:>11.1f}"
+                f"{new['p50_us']:>9.1f}{old['p99_us']:>11.1f}{new['p99_us']:>9.1f}"
+                f"{change:>+10.1f}%{throughput}"
+            )
+
+
+if __name__ == "__main__":
+    main()
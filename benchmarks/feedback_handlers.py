@@ -0,0 +1,173 @@
+"""Measure the feedback handlers of TIS entities under a mixed workload.
+
+Builds one device of lights, covers, ACs and energy sensors on the stubs
+of entity_scaling, parses a mixed stream of synthetic feedback once and
+then times only the handlers of the entities each record reaches. The
+event bus, the parsing and the channel state store are not part of the
+measurement, the state writes the handlers make are. The store holds the
+levels of the whole stream, so the handlers read final levels.
+
+Run it from the directory containing the integration, with the
+integration requirements and homeassistant installed:
+
+    python -m tis_integration.benchmarks.feedback_handlers
+    python -m tis_integration.benchmarks.feedback_handlers --kinds climate
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+from collections import defaultdict
+from collections.abc import Callable, Iterable
+import random
+import time
+
+from homeassistant.core import CALLBACK_TYPE, Event
+
+from .. import sensor
+from ..dispatcher import FeedbackDispatcher
+from ..feedback import CHANNEL_FEEDBACK_TYPES, Feedback, parse_feedback
+from .entity_scaling import (
+    LIGHT_FEEDBACK_TYPES,
+    StubApi,
+    StubCoordinator,
+    StubHass,
+    async_add_entities,
+    build_entities,
+    stub_runtime_data,
+    synthetic_feedback,
+)
+
+HANDLER_KINDS = ("light", "cover", "climate", "energy_sensor")
+
+
+class RecordingDispatcher(FeedbackDispatcher):
+    """Dispatcher remembering the handler of every subscription."""
+
+    def __init__(self, *args, **kwargs) -> None:
+        """Initialize the dispatcher."""
+        super().__init__(*args, **kwargs)
+        self.handlers: defaultdict[tuple, list[Callable]] = defaultdict(list)
+
+    def async_subscribe(
+        self,
+        device_id: list[int],
+        feedback_types: Iterable[str],
+        target: Callable[[Feedback], object],
+        channel: int | None = None,
+    ) -> CALLBACK_TYPE:
+        """Subscribe target and remember it by device, type and channel."""
+        feedback_types = list(feedback_types)
+        for feedback_type in feedback_types:
+            if feedback_type not in CHANNEL_FEEDBACK_TYPES:
+                key_channel = None
+            else:
+                key_channel = None if channel is None else int(channel)
+            self.handlers[(tuple(device_id), feedback_type, key_channel)].append(target)
+        return super().async_subscribe(device_id, feedback_types, target, channel)
+
+    def targets(self, feedback: Feedback) -> list[Callable]:
+        """Return the handlers the dispatcher delivers a record to."""
+        key = (feedback.device_id, feedback.feedback_type)
+        targets = list(self.handlers.get((*key, None), ()))
+        if (channel := getattr(feedback, "channel", None)) is not None:
+            targets.extend(self.handlers.get((*key, channel), ()))
+        return targets
+
+
+async def _async_workload(
+    args: argparse.Namespace,
+) -> list[tuple[str, list[Callable], Feedback]]:
+    """Return the kind, handlers and record of every packet of the workload."""
+    hass = StubHass(asyncio.get_running_loop())
+    api = StubApi()
+    runtime_data = stub_runtime_data(hass, api, 0, RecordingDispatcher)
+    dispatcher: RecordingDispatcher = runtime_data.dispatcher
+    devices = {}
+    for number, kind in enumerate(args.kinds, 1):
+        entities = build_entities(kind, args.channels, args.channels, hass, api)
+        # every kind gets a device of its own
+        devices[kind] = [number, 1]
+        for entity in entities:
+            entity.device_id = devices[kind]
+        await async_add_entities(kind, entities, hass, runtime_data, lambda: None)
+
+    rng = random.Random(args.seed)
+    workload = []
+    for _ in range(args.packets):
+        kind = rng.choice(args.kinds)
+        _, data = synthetic_feedback(
+            kind, 1, args.channels, list(LIGHT_FEEDBACK_TYPES), rng
+        )
+        data["device_id"] = devices[kind]
+        feedback = parse_feedback(Event(str(devices[kind]), data))
+        # the handlers read the levels the dispatcher stored before them
+        runtime_data.channel_states.async_process_feedback(feedback)
+        workload.append((kind, dispatcher.targets(feedback), feedback))
+    return workload
+
+
+async def _async_time(
+    workload: list[tuple[str, list[Callable], Feedback]], repeats: int
+) -> float:
+    """Return the best time of running every handler of the workload."""
+    best = float("inf")
+    perf_counter = time.perf_counter
+    for _ in range(repeats):
+        started = perf_counter()
+        for _, targets, feedback in workload:
+            for target in targets:
+                target(feedback)
+        best = min(best, perf_counter() - started)
+        # flush the state writes the handlers scheduled
+        await asyncio.sleep(0)
+    return best
+
+
+async def _async_run(
+    args: argparse.Namespace,
+) -> list[tuple[str, str, int, int, float]]:
+    """Return kind, feedback type, packets, calls and ns per call of every group."""
+    workload = await _async_workload(args)
+    groups = defaultdict(list)
+    for packet in workload:
+        groups[(packet[0], packet[2].feedback_type)].append(packet)
+    results = []
+    for (kind, feedback_type), packets in [
+        *sorted(groups.items()),
+        (("mixed", ""), workload),
+    ]:
+        calls = sum(len(targets) for _, targets, _ in packets)
+        if not calls:
+            # feedback no handler of the kind subscribes to
+            continue
+        elapsed = await _async_time(packets, args.repeats)
+        results.append(
+            (kind, feedback_type, len(packets), calls, elapsed / calls * 1e9)
+        )
+    return results
+
+
+def main() -> None:
+    """Run the benchmark and print the results."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--kinds", nargs="+", default=list(HANDLER_KINDS), choices=HANDLER_KINDS
+    )
+    parser.add_argument("--channels", type=int, default=8, help="per device")
+    parser.add_argument("--packets", type=int, default=20000)
+    parser.add_argument("--repeats", type=int, default=7, help="best of")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    # energy sensors poll through a coordinator, they get one that never runs
+    sensor.get_coordinator = lambda *args, **kwargs: StubCoordinator()
+    results = asyncio.run(_async_run(args))
+    print(f"{'kind':<14}{'feedback':<22}{'packets':>9}{'calls':>9}{'ns/call':>9}")
+    for kind, feedback_type, packets, calls, ns_per_call in results:
+        print(f"{kind:<14}{feedback_type:<22}{packets:>9}{calls:>9}{ns_per_call:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
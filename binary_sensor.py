@@ -9,11 +9,13 @@ from homeassistant.components.binary_sensor import (
     STATE_ON,
     BinarySensorEntity,
 )
-from homeassistant.const import MATCH_ALL
-from homeassistant.core import Event, HomeAssistant, callback
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
 from . import TISConfigEntry
+from .dispatcher import async_subscribe_feedback
+from .feedback import AutoBinaryFeedback, Feedback, RealtimeFeedback
+from .state_writer import async_write_state
 
 
 async def async_setup_entry(
@@ -22,7 +24,7 @@ async def async_setup_entry(
     """Set up the TIS binary sensors."""
     tis_api: TISApi = entry.runtime_data.api
     # Fetch all switches from the TIS API
-    binary_sensors: dict = await tis_api.get_entities(platform="binary_sensor")
+    binary_sensors: dict = entry.runtime_data.catalog.entities("binary_sensor")
     if binary_sensors:
         sensor_entities = [
             (
@@ -74,37 +76,38 @@ class TISBinarySensor(BinarySensorEntity):
 
     async def async_added_to_hass(self):
         @callback
-        async def handle_event(event: Event):
-            """Handle the event."""
-            if event.event_type == str(self._device_id):
-                if event.data["feedback_type"] == "auto_binary_feedback":
-                    channel_value = event.data["channels_values"][
-                        self._channel_number - 1
-                    ]
-                    if int(channel_value) == 1:
-                        self._attr_is_on = True
-                        self._attr_state = STATE_ON
-                    else:
-                        self._attr_is_on = False
-                        self._attr_state = STATE_OFF
-
-                elif event.data["feedback_type"] == "realtime_feedback":
-                    if event.data["channel_number"] == self._channel_number:
-                        updated_channel_value = int(event.data["additional_bytes"][1])
-                        if updated_channel_value == 100:
-                            self._attr_is_on = True
-                            self._attr_state = STATE_ON
-                        else:
-                            self._attr_is_on = False
-                            self._attr_state = STATE_OFF
-
-            await self.async_update_ha_state(True)
-
-        self._listener = self.hass.bus.async_listen(MATCH_ALL, handle_event)
+        def handle_event(feedback: Feedback):
+            """Handle the feedback."""
+            if isinstance(feedback, AutoBinaryFeedback):
+                channel_value = feedback.channels_values[self._channel_number - 1]
+                if int(channel_value) == 1:
+                    self._attr_is_on = True
+                    self._attr_state = STATE_ON
+                else:
+                    self._attr_is_on = False
+                    self._attr_state = STATE_OFF
+
+            elif isinstance(feedback, RealtimeFeedback):
+                updated_channel_value = feedback.value
+                if updated_channel_value == 100:
+                    self._attr_is_on = True
+                    self._attr_state = STATE_ON
+                else:
+                    self._attr_is_on = False
+                    self._attr_state = STATE_OFF
+
+            async_write_state(self)
+
+        self._listener = async_subscribe_feedback(
+            self,
+            self._device_id,
+            ("auto_binary_feedback", "realtime_feedback"),
+            handle_event,
+            self._channel_number,
+        )
 
     async def async_will_remove_from_hass(self):
         """Remove the listener when the entity is removed."""
-        self._listener()
         self._listener = None
 
     @property
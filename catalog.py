@@ -0,0 +1,87 @@
+"""Index of the appliances configured for TIS Control."""
+
+from __future__ import annotations
+
+import logging
+from typing import Any
+
+from TISControlProtocol.api import TISApi
+
+_LOGGER = logging.getLogger(__name__)
+
+# an appliance as the platforms see it: platform, name and details
+Appliance = tuple[str, str, dict[str, Any]]
+
+
+class EntityCatalog:
+    """Appliances of the TIS configuration, loaded once per config entry.
+
+    Reading the configuration decrypts and parses the whole file, the
+    platforms look their appliances up here instead of each reading it
+    again. Appliances are indexed by platform, device and gateway, and the
+    configured channels are collected per device.
+    """
+
+    def __init__(self, config_entries: dict[str, Any]) -> None:
+        """Initialize the catalog from the parsed configuration of the api."""
+        self._platforms = config_entries
+        self._devices: dict[tuple[int, ...], list[Appliance]] = {}
+        self._gateways: dict[str, list[Appliance]] = {}
+        self._channels: dict[tuple[int, ...], set[int]] = {}
+        for platform, appliances in config_entries.items():
+            if not isinstance(appliances, list):
+                # the lock module holds settings, not appliances
+                continue
+            for appliance in appliances:
+                for name, details in appliance.items():
+                    entry = (platform, name, details)
+                    device = tuple(details["device_id"])
+                    self._devices.setdefault(device, []).append(entry)
+                    self._gateways.setdefault(details["gateway"], []).append(entry)
+                    self._channels.setdefault(device, set()).update(
+                        int(channel["channel_number"])
+                        for channel in details.get("channels", ())
+                    )
+
+    @classmethod
+    async def async_load(cls, api: TISApi) -> EntityCatalog:
+        """Read the configuration once, an unreadable one is empty."""
+        try:
+            await api.get_entities()
+        except Exception as e:  # noqa: BLE001
+            _LOGGER.error("Error reading the TIS configuration: %s", e)
+            return cls({})
+        return cls(api.config_entries)
+
+    def entities(self, platform: str) -> Any:
+        """Return the appliances of a platform like TISApi.get_entities."""
+        return self._platforms.get(platform, [])
+
+    def device(self, device_id: list[int] | tuple[int, ...]) -> list[Appliance]:
+        """Return the appliances of a device."""
+        return self._devices.get(tuple(device_id), [])
+
+    def gateway(self, gateway: str) -> list[Appliance]:
+        """Return the appliances behind a gateway."""
+        return self._gateways.get(gateway, [])
+
+    def channels(self) -> dict[tuple[int, ...], frozenset[int]]:
+        """Return the channels configured on every device."""
+        return {
+            device: frozenset(channels) for device, channels in self._channels.items()
+        }
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the number of appliances per platform, device and gateway."""
+        return {
+            "platforms": {
+                platform: len(appliances)
+                for platform, appliances in self._platforms.items()
+                if isinstance(appliances, list)
+            },
+            "devices": len(self._devices),
+            "gateways": {
+                gateway: len(appliances)
+                for gateway, appliances in self._gateways.items()
+            },
+        }
@@ -0,0 +1,221 @@
+"""Per-device channel state store for TIS Control."""
+
+from __future__ import annotations
+
+from collections.abc import Callable, Iterable
+
+from homeassistant.core import HomeAssistant, callback
+
+from .const import DEVICES_DICT, DOMAIN, MODEL_CHANNELS
+from .feedback import (
+    BinaryFeedback,
+    ControlResponse,
+    Feedback,
+    OfflineDevice,
+    UpdateResponse,
+    channel_is_on,
+)
+
+# stored for channels whose level has not been reported yet, real channel
+# levels are percentages so they never reach this value
+UNKNOWN_LEVEL = 0xFF
+BROADCAST_CHANNEL = 255
+
+
+class ChannelStateStore:
+    """Channel levels (0-100) of every TIS device, one bytearray per device.
+
+    Feedback packets are applied once per packet and entities read their
+    channel from here instead of parsing the payload themselves. The
+    channels of a device come from the TIS configuration at setup, its
+    model from discovery once a scan or announcement reported it.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the store."""
+        self.hass = hass
+        self._devices: dict[tuple[int, ...], bytearray] = {}
+        # devices whose levels come from the snapshot of the last run
+        self.restored_devices: set[tuple[int, ...]] = set()
+        # channels of every device in the TIS configuration
+        self._configured: dict[tuple[int, ...], frozenset[int]] = {}
+        # models of the discovered devices and how many were indexed
+        self._models: dict[tuple[int, ...], str] = {}
+        self._discovered = 0
+        # called after feedback changed the store
+        self.on_change: Callable[[], None] | None = None
+        self._feedback_handlers = {
+            UpdateResponse: self._apply_update_response,
+            ControlResponse: self._apply_control_response,
+            BinaryFeedback: self._apply_binary_feedback,
+            OfflineDevice: self._apply_offline_device,
+        }
+
+    def add_device(
+        self, device_id: list[int] | tuple[int, ...], channel_numbers: Iterable[int]
+    ) -> None:
+        """Add a device of the TIS configuration with its configured channels."""
+        device = tuple(device_id)
+        channels = self._configured[device] = frozenset(channel_numbers) - {
+            BROADCAST_CHANNEL
+        }
+        self._channels(device, max(channels, default=0))
+
+    def model(self, device_id: list[int] | tuple[int, ...]) -> str | None:
+        """Return the model of a device, None until discovery reported it.
+
+        Only devices discovered since the last call are indexed. After a
+        restart nothing has been discovered yet.
+        """
+        discovered = self.hass.data.get(DOMAIN, {}).get("discovered_devices", ())
+        if len(discovered) != self._discovered:
+            # a new scan starts the list over
+            start = self._discovered if len(discovered) > self._discovered else 0
+            for info in discovered[start:]:
+                if model := DEVICES_DICT.get(tuple(info["device_type"])):
+                    self._models[tuple(info["device_id"])] = model
+            self._discovered = len(discovered)
+        return self._models.get(tuple(device_id))
+
+    def model_channels(self, device_id: list[int] | tuple[int, ...]) -> frozenset[int]:
+        """Return every channel of a device's model, none until it is known."""
+        if (model_channels := MODEL_CHANNELS.get(self.model(device_id))) is None:
+            return frozenset()
+        return frozenset(range(1, model_channels + 1))
+
+    def device_channels(self, device_id: list[int] | tuple[int, ...]) -> frozenset[int]:
+        """Return the channels of a device.
+
+        Every channel of its model once the model is known, otherwise the
+        channels configured on it.
+        """
+        if model_channels := self.model_channels(device_id):
+            return model_channels
+        return self._configured.get(tuple(device_id), frozenset())
+
+    def _channels(
+        self, device_id: list[int] | tuple[int, ...], size: int = 0
+    ) -> bytearray:
+        """Return the channel array of a device, growing it to size."""
+        device = tuple(device_id)
+        channels = self._devices.get(device)
+        if channels is None:
+            size = max(size, max(self.device_channels(device), default=0))
+            channels = self._devices[device] = bytearray([UNKNOWN_LEVEL]) * size
+        elif len(channels) < size:
+            channels.extend([UNKNOWN_LEVEL] * (size - len(channels)))
+        return channels
+
+    def register(self, device_id: list[int], *channel_numbers: int) -> None:
+        """Reserve room for the given channels of a device."""
+        channel_numbers = [c for c in channel_numbers if c != BROADCAST_CHANNEL]
+        self._channels(device_id, max(channel_numbers, default=0))
+
+    def get(self, device_id: list[int], channel_number: int) -> int | None:
+        """Return the level of a channel or None if it is unknown.
+
+        The broadcast channel reports the level shared by every channel.
+        """
+        channels = self._devices.get(tuple(device_id))
+        if channels is None:
+            return None
+        if channel_number == BROADCAST_CHANNEL:
+            level = (
+                channels[0]
+                if channels and channels.count(channels[0]) == len(channels)
+                else UNKNOWN_LEVEL
+            )
+        elif 0 < channel_number <= len(channels):
+            level = channels[channel_number - 1]
+        else:
+            return None
+        return None if level == UNKNOWN_LEVEL else level
+
+    def max_level(self, device_id: list[int]) -> int | None:
+        """Return the level of the brightest channel or None if none is known."""
+        channels = self._devices.get(tuple(device_id))
+        levels = [level for level in channels or () if level != UNKNOWN_LEVEL]
+        return max(levels, default=None)
+
+    def set(self, device_id: list[int], channel_number: int, level: int | None) -> None:
+        """Set the level of a channel, None marks it unknown.
+
+        The broadcast channel sets every known channel of the device.
+        """
+        level = UNKNOWN_LEVEL if level is None else int(level)
+        if channel_number == BROADCAST_CHANNEL:
+            channels = self._channels(device_id)
+            channels[:] = bytes([level]) * len(channels)
+        elif channel_number > 0:
+            self._channels(device_id, channel_number)[channel_number - 1] = level
+
+    def restore(self, device_id: tuple[int, ...], levels: bytes) -> None:
+        """Set the levels of a device saved by the last run."""
+        self._devices[device_id] = bytearray(levels)
+        self.restored_devices.add(device_id)
+
+    def is_restored(self, device_id: list[int]) -> bool:
+        """Return whether no feedback of the device arrived since restoring it."""
+        return tuple(device_id) in self.restored_devices
+
+    def as_snapshot(self) -> dict[str, str]:
+        """Return the levels of every device, for the snapshot."""
+        return {
+            ",".join(map(str, device)): channels.hex()
+            for device, channels in self._devices.items()
+        }
+
+    @callback
+    def async_process_feedback(self, feedback: Feedback) -> None:
+        """Apply a feedback record to the store."""
+        apply = self._feedback_handlers.get(type(feedback))
+        if apply is not None:
+            apply(feedback)
+            self.restored_devices.discard(feedback.device_id)
+            if self.on_change is not None:
+                self.on_change()
+
+    def _apply_update_response(self, feedback: UpdateResponse) -> None:
+        channels = self._channels(feedback.device_id, len(feedback.levels))
+        channels[: len(feedback.levels)] = feedback.levels
+
+    def _apply_control_response(self, feedback: ControlResponse) -> None:
+        self.set(feedback.device_id, feedback.channel, feedback.level)
+
+    def _apply_binary_feedback(self, feedback: BinaryFeedback) -> None:
+        channels = self._channels(feedback.device_id, feedback.count)
+        for index in range(feedback.count):
+            if not channel_is_on(feedback.bitmap, index + 1):
+                channels[index] = 0
+            elif channels[index] in (0, UNKNOWN_LEVEL):
+                # the bitmap only says the channel is on, not its level
+                channels[index] = 100
+
+    def _apply_offline_device(self, feedback: OfflineDevice) -> None:
+        self.set(feedback.device_id, feedback.channel, None)
+
+
+def all_channels_devices(
+    entities: Iterable[tuple[list[int], str, int]],
+) -> dict[tuple[int, ...], str]:
+    """Return the gateway of every device lacking a broadcast channel entity.
+
+    entities are the (device_id, gateway, channel) of the entities of a
+    platform.
+    """
+    devices: dict[tuple[int, ...], str] = {}
+    with_broadcast = set()
+    for device_id, gateway, channel in entities:
+        devices.setdefault(tuple(device_id), gateway)
+        if int(channel) == BROADCAST_CHANNEL:
+            with_broadcast.add(tuple(device_id))
+    return {
+        device: gateway
+        for device, gateway in devices.items()
+        if device not in with_broadcast
+    }
+
+
+def all_channels_name(device_id: list[int] | tuple[int, ...]) -> str:
+    """Return the name of the entity setting every channel of a device."""
+    return f"TIS {'-'.join(map(str, device_id))} all channels"
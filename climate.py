@@ -3,6 +3,7 @@
 from __future__ import annotations
 
 import logging
+from operator import attrgetter
 from typing import Any
 
 from TISControlProtocol.api import TISApi
@@ -23,11 +24,28 @@ from homeassistant.components.climate import (
     UnitOfTemperature,
 )
 from homeassistant.const import STATE_OFF, STATE_ON, STATE_UNKNOWN
-from homeassistant.core import Event, HomeAssistant, callback
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
 from . import TISConfigEntry
-from .const import FAN_MODES, TEMPERATURE_RANGES
+from .commands import CommandCoalescer, async_run_command
+from .const import (
+    FAN_MODES,
+    PACKET_FAN_MODES,
+    PACKET_HVAC_MODES,
+    TEMPERATURE_LIMITS,
+    TEMPERATURE_RANGES,
+)
+from .dispatcher import async_subscribe_feedback
+from .feedback import ACFeedback, ACUpdate, Feedback, FloorFeedback, FloorUpdate
+from .scheduler import (
+    async_request_update,
+    async_send,
+    async_send_with_ack,
+    command_priority,
+)
+from .snapshot import async_restore_entity, async_save_entity
+from .state_writer import async_write_state
 
 handler = TISProtocolHandler()
 
@@ -38,7 +56,7 @@ async def async_setup_entry(
     """Set up the climate platform."""
     tis_api: TISApi = entry.runtime_data.api
     # Fetch all ACs from the TIS API
-    acs: list[dict] = await tis_api.get_entities(platform="ac")
+    acs: list[dict] = entry.runtime_data.catalog.entities("ac")
     if acs:
         # Prepare a list of tuples containing necessary ac details
         ac_entities = [
@@ -67,7 +85,7 @@ async def async_setup_entry(
         async_add_devices(tis_acs)
 
     # Fetch all floor heating from the TIS API
-    heaters: list[dict] = await tis_api.get_entities(platform="floor_heating")
+    heaters: list[dict] = entry.runtime_data.catalog.entities("floor_heating")
     if heaters:
         # Prepare a list of tuples containing necessary heater details
         heater_entities = [
@@ -120,6 +138,8 @@ class TISClimate(ClimateEntity):
         # initialize all required attributes for the climate entity
         self.update_packet: TISPacket = handler.generate_ac_update_packet(self)
         self.listener = None
+        # setpoint changes only, other AC packets carry the current setpoint
+        self.setpoint_commands = CommandCoalescer(self)
         self._attr_state = STATE_OFF
         self._attr_target_temperature = None
         self._attr_max_temp = None
@@ -134,11 +154,9 @@ class TISClimate(ClimateEntity):
         self._attr_hvac_mode = HVACMode.OFF
         self._attr_fan_mode = FAN_MEDIUM
 
-        self._attr_max_temp = TEMPERATURE_RANGES[self._attr_hvac_mode]["max"][
-            self._unit_index
-        ]
-        self._attr_min_temp = TEMPERATURE_RANGES[self._attr_hvac_mode]["min"][
-            self._unit_index
+        self._temperature_limits = TEMPERATURE_LIMITS[self._unit_index]
+        self._attr_min_temp, self._attr_max_temp = self._temperature_limits[
+            self._attr_hvac_mode
         ]
         # self._attr_target_temperature = TEMPERATURE_RANGES[self._attr_hvac_mode][
         #     "target"
@@ -175,118 +193,141 @@ class TISClimate(ClimateEntity):
         """Subscribe to events."""
 
         @callback
-        async def handle_event(event: Event):
-            """Handle the event."""
-            if event.event_type == str(self.device_id):
-                feedback_type = event.data.get("feedback_type", None)
-                if feedback_type == "ac_feedback":
-                    ac_number = event.data["number"]
-                    sub_operation = event.data["sub_operation"]
-                    operation_value = event.data["operation_value"]
-
-                    if self.ac_number == int(ac_number):
-                        logging.info(f"AC feedback event: {event.data}")
-                        if sub_operation == 0x03:
-                            if operation_value == 0x00:
-                                # Turn off
-                                self._attr_state = STATE_OFF
-                                self._attr_hvac_mode = HVACMode.OFF
-                                logging.info("AC turned off")
-                        else:
-                            self._attr_state = STATE_ON
-                            if sub_operation == 0x04:
-                                # Update cool mode temperature
-                                self._attr_hvac_mode = HVACMode.COOL
-                                self._attr_target_temperature = operation_value
-
-                                logging.info(
-                                    f"Cool mode temperature updated to {operation_value}"
-                                )
-                            elif sub_operation == 0x05:
-                                # Update fan speed
-                                self._attr_fan_mode = next(
-                                    key
-                                    for key, value in FAN_MODES.items()
-                                    if value == operation_value
-                                )
-                                logging.info(f"Fan speed updated to {operation_value}")
-                            elif sub_operation == 0x06:
-                                # Change HVAC mode
-                                self._attr_hvac_mode = next(
-                                    (
-                                        hvac_mode
-                                        for hvac_mode, settings in TEMPERATURE_RANGES.items()
-                                        if settings["packet_mode_index"]
-                                        == operation_value
-                                    ),
-                                    None,
-                                )
-                                logging.info(f"HVAC mode changed to {operation_value}")
-                            elif sub_operation == 0x07:
-                                # Update heating mode temperature
-                                self._attr_hvac_mode = HVACMode.HEAT
-                                self._attr_target_temperature = operation_value
-
-                                logging.info(
-                                    f"Heating mode temperature updated to {operation_value}"
-                                )
-
-                            elif sub_operation == 0x08:
-                                # Update Auto mode temperature
-                                self._attr_hvac_mode = HVACMode.AUTO
-                                self._attr_target_temperature = operation_value
-
-                                logging.info(
-                                    f"Auto mode temperature updated to {operation_value}"
-                                )
-
-                            else:
-                                logging.error(
-                                    f"Unknown sub operation for AC feedback: {sub_operation}"
-                                )
-                elif feedback_type == "update_feedback":
-                    if event.data["ac_number"] == self.ac_number:
-                        if event.data["state"] == 0x00:
-                            # turn off
-                            self._attr_state = STATE_OFF
-                            self._attr_hvac_mode = HVACMode.OFF
-                        else:
-                            self._attr_state = STATE_ON
-                            self._attr_hvac_mode = next(
-                                (
-                                    hvac_mode
-                                    for hvac_mode, settings in TEMPERATURE_RANGES.items()
-                                    if settings["packet_mode_index"]
-                                    == event.data["hvac_mode"]
-                                ),
-                                None,
-                            )
-                            self._attr_fan_mode = next(
-                                key
-                                for key, value in FAN_MODES.items()
-                                if value == event.data["fan_speed"]
-                            )
-                            # set temperature rangs
-                            self._attr_min_temp = TEMPERATURE_RANGES[self.hvac_mode][
-                                "min"
-                            ][self._unit_index]
-                            self._attr_max_temp = TEMPERATURE_RANGES[self.hvac_mode][
-                                "max"
-                            ][self._unit_index]
-                            # setting temperature based on mode
-                            if self._attr_hvac_mode == HVACMode.COOL:
-                                self._attr_target_temperature = event.data["cool_temp"]
-                            elif self._attr_hvac_mode == HVACMode.HEAT:
-                                self._attr_target_temperature = event.data["heat_temp"]
-                            elif self._attr_hvac_mode == HVACMode.AUTO:
-                                self._attr_target_temperature = event.data["auto_temp"]
-                            else:
-                                self._attr_target_temperature = None
-            self.async_write_ha_state()
-            await self.async_update_ha_state(True)
-
-        self.listener = self.hass.bus.async_listen(str(self.device_id), handle_event)
-        await self.api.protocol.sender.send_packet(self.update_packet)
+        def handle_event(feedback: Feedback):
+            """Handle the feedback."""
+            if feedback.channel == self.ac_number:
+                self._FEEDBACK_HANDLERS[type(feedback)](self, feedback)
+                async_save_entity(self, self._SNAPSHOT_ATTRIBUTES)
+            async_write_state(self)
+
+        # start from the state saved by the last run until the AC answers
+        async_restore_entity(self, self._SNAPSHOT_ATTRIBUTES)
+        self.listener = async_subscribe_feedback(
+            self,
+            self.device_id,
+            ("ac_feedback", "update_feedback"),
+            handle_event,
+            self.ac_number,
+        )
+        self.platform.config_entry.async_create_background_task(
+            self.hass,
+            async_request_update(self, self.update_packet),
+            f"{self.entity_id} state",
+        )
+
+    def _handle_ac_feedback(self, feedback: ACFeedback) -> None:
+        """Apply a single setting reported by the AC."""
+        logging.info(f"AC feedback: {feedback}")
+        if feedback.sub_operation != 0x03:
+            self._attr_state = STATE_ON
+        apply = self._AC_SUB_OPERATIONS.get(feedback.sub_operation)
+        if apply is None:
+            logging.error(
+                f"Unknown sub operation for AC feedback: {feedback.sub_operation}"
+            )
+        else:
+            apply(self, feedback.value)
+
+    def _apply_power(self, value: int) -> None:
+        """Apply a power report, only turning off is reported."""
+        if value == 0x00:
+            # Turn off
+            self._attr_state = STATE_OFF
+            self._attr_hvac_mode = HVACMode.OFF
+            logging.info("AC turned off")
+
+    def _apply_cool_temperature(self, value: int) -> None:
+        """Apply a cool mode temperature report."""
+        self._attr_hvac_mode = HVACMode.COOL
+        self._attr_target_temperature = value
+        logging.info(f"Cool mode temperature updated to {value}")
+
+    def _apply_fan_speed(self, value: int) -> None:
+        """Apply a fan speed report."""
+        fan_mode = PACKET_FAN_MODES.get(value)
+        if fan_mode is None:
+            logging.warning(f"Unknown fan speed in AC feedback: {value}")
+            return
+        self._attr_fan_mode = fan_mode
+        logging.info(f"Fan speed updated to {value}")
+
+    def _apply_hvac_mode(self, value: int) -> None:
+        """Apply a HVAC mode report."""
+        hvac_mode = PACKET_HVAC_MODES.get(value)
+        if hvac_mode is None:
+            logging.warning(f"Unknown HVAC mode in AC feedback: {value}")
+            return
+        self._attr_hvac_mode = hvac_mode
+        logging.info(f"HVAC mode changed to {value}")
+
+    def _apply_heat_temperature(self, value: int) -> None:
+        """Apply a heating mode temperature report."""
+        self._attr_hvac_mode = HVACMode.HEAT
+        self._attr_target_temperature = value
+        logging.info(f"Heating mode temperature updated to {value}")
+
+    def _apply_auto_temperature(self, value: int) -> None:
+        """Apply an auto mode temperature report."""
+        self._attr_hvac_mode = HVACMode.AUTO
+        self._attr_target_temperature = value
+        logging.info(f"Auto mode temperature updated to {value}")
+
+    def _handle_ac_update(self, feedback: ACUpdate) -> None:
+        """Apply every setting reported by the AC."""
+        if feedback.state == 0x00:
+            # turn off
+            self._attr_state = STATE_OFF
+            self._attr_hvac_mode = HVACMode.OFF
+            return
+        self._attr_state = STATE_ON
+        hvac_mode = PACKET_HVAC_MODES.get(feedback.hvac_mode)
+        if hvac_mode is None:
+            logging.warning(f"Unknown HVAC mode in AC update: {feedback.hvac_mode}")
+        else:
+            self._attr_hvac_mode = hvac_mode
+            # set temperature rangs
+            self._attr_min_temp, self._attr_max_temp = self._temperature_limits[
+                hvac_mode
+            ]
+        fan_mode = PACKET_FAN_MODES.get(feedback.fan_speed)
+        if fan_mode is None:
+            logging.warning(f"Unknown fan speed in AC update: {feedback.fan_speed}")
+        else:
+            self._attr_fan_mode = fan_mode
+        # setting temperature based on mode
+        target_temperature = self._MODE_TEMPERATURES.get(self._attr_hvac_mode)
+        self._attr_target_temperature = (
+            target_temperature(feedback) if target_temperature else None
+        )
+
+    # ac_feedback sub operation -> setting it reports
+    _AC_SUB_OPERATIONS = {
+        0x03: _apply_power,
+        0x04: _apply_cool_temperature,
+        0x05: _apply_fan_speed,
+        0x06: _apply_hvac_mode,
+        0x07: _apply_heat_temperature,
+        0x08: _apply_auto_temperature,
+    }
+    # update_feedback field holding the target temperature of a mode
+    _MODE_TEMPERATURES = {
+        HVACMode.COOL: attrgetter("cool_temp"),
+        HVACMode.HEAT: attrgetter("heat_temp"),
+        HVACMode.AUTO: attrgetter("auto_temp"),
+    }
+    _FEEDBACK_HANDLERS = {
+        ACFeedback: _handle_ac_feedback,
+        ACUpdate: _handle_ac_update,
+    }
+    # kept in the snapshot for the next start
+    _SNAPSHOT_ATTRIBUTES = (
+        "_attr_state",
+        "_attr_hvac_mode",
+        "_attr_fan_mode",
+        "_attr_target_temperature",
+        "_attr_min_temp",
+        "_attr_max_temp",
+    )
 
     # getters
     @property
@@ -352,8 +393,7 @@ class TISClimate(ClimateEntity):
         else:
             new_state = STATE_ON
             # Determine the new temperature ranges and target temperature
-            new_min_temp = TEMPERATURE_RANGES[hvac_mode]["min"][self._unit_index]
-            new_max_temp = TEMPERATURE_RANGES[hvac_mode]["max"][self._unit_index]
+            new_min_temp, new_max_temp = self._temperature_limits[hvac_mode]
             new_target_temperature = self.mode_target_temperatures[hvac_mode]
 
         # Generate the packet with the new values
@@ -366,20 +406,20 @@ class TISClimate(ClimateEntity):
             target_mode=hvac_mode,
         )
 
-        # Send the packet and check for acknowledgment
-        ack_stats = await self.api.protocol.sender.send_packet_with_ack(packet)
-        if ack_stats:
-            # Update the class attributes only if the packet is acknowledged
-            self._attr_hvac_mode = hvac_mode
-            self._attr_state = new_state
-            self._attr_min_temp = new_min_temp
-            self._attr_max_temp = new_max_temp
-            self._attr_target_temperature = new_target_temperature
-        else:
-            logging.error("Failed to set hvac mode")
-            self._attr_state = STATE_UNKNOWN
-            self._attr_hvac_mode = None
-        self.async_write_ha_state()
+        # Update the class attributes once the packet is acknowledged, or
+        # right away in optimistic mode
+        await async_run_command(
+            self,
+            async_send_with_ack(self, packet),
+            {
+                "_attr_hvac_mode": hvac_mode,
+                "_attr_state": new_state,
+                "_attr_min_temp": new_min_temp,
+                "_attr_max_temp": new_max_temp,
+                "_attr_target_temperature": new_target_temperature,
+            },
+            {"_attr_state": STATE_UNKNOWN, "_attr_hvac_mode": None},
+        )
 
     async def async_set_fan_mode(self, fan_mode: str) -> None:
         """."""
@@ -389,7 +429,7 @@ class TISClimate(ClimateEntity):
             FAN_MODES,
             target_fan_mode=fan_mode,
         )
-        ack_stats = await self.api.protocol.sender.send_packet_with_ack(packet)
+        ack_stats = await async_send_with_ack(self, packet)
         if ack_stats:
             self._attr_fan_mode = fan_mode
         else:
@@ -408,7 +448,10 @@ class TISClimate(ClimateEntity):
             FAN_MODES,
             target_temperature=new_target_temperature,
         )
-        ack_status = await self.api.protocol.sender.send_packet_with_ack(packet)
+        ack_status = await self.setpoint_commands.async_send_with_ack(packet)
+        if ack_status is None:
+            # a newer setpoint replaced this one, it sets the state
+            return
         if ack_status:
             self._attr_target_temperature = new_target_temperature
             # update temperature holders
@@ -462,11 +505,9 @@ class TISFloorHeating(ClimateEntity):
     def setup_heater(self):
         """Set up the AC."""
         self._attr_hvac_mode = HVACMode.HEAT
-        self._attr_max_temp = TEMPERATURE_RANGES[self._attr_hvac_mode]["max"][
-            self._unit_index
-        ]
-        self._attr_min_temp = TEMPERATURE_RANGES[self._attr_hvac_mode]["min"][
-            self._unit_index
+        self._temperature_limits = TEMPERATURE_LIMITS[self._unit_index]
+        self._attr_min_temp, self._attr_max_temp = self._temperature_limits[
+            self._attr_hvac_mode
         ]
         self._attr_target_temperature = TEMPERATURE_RANGES[self._attr_hvac_mode][
             "target"
@@ -490,66 +531,79 @@ class TISFloorHeating(ClimateEntity):
         """Subscribe to events."""
 
         @callback
-        async def handle_event(event: Event):
-            """Handle the event."""
-            if event.event_type == str(self.device_id):
-                feedback_type = event.data.get("feedback_type", None)
-                if feedback_type == "floor_feedback":
-                    logging.info(f"floor heating feedback event: {event.data}")
-                    heater_number = event.data["number"]
-                    sub_operation = event.data["sub_operation"]
-                    operation_value = event.data["operation_value"]
-
-                    if self.heater_number == int(heater_number):
-                        if sub_operation == 0x14:
-                            if operation_value == 0x00:
-                                # Turn off
-                                self._attr_state = STATE_OFF
-                                self._attr_hvac_mode = HVACMode.OFF
-                                logging.info("Heater turned off")
-                            else:
-                                self._attr_state = STATE_ON
-                                self._attr_hvac_mode = HVACMode.HEAT
-                                self._attr_target_temperature = operation_value
-                                self._attr_current_temperature = operation_value
-                                logging.info(
-                                    f"Heating mode temperature updated to {operation_value}"
-                                )
-                        elif sub_operation == 0x18:
-                            # set temperature
-                            self._attr_target_temperature = operation_value
-                            self._attr_current_temperature = operation_value
-                        else:
-                            logging.error(
-                                f"Unknown sub operation for AC feedback: {sub_operation}"
-                            )
-                elif feedback_type == "floor_update":
-                    logging.info(f"floor heating update event: {event.data}")
-                    if event.data["heater_number"] == self.heater_number:
-                        if event.data["state"] == 0x00:
-                            # turn off
-                            self._attr_state = STATE_OFF
-                            self._attr_hvac_mode = HVACMode.OFF
-                        else:
-                            self._attr_state = STATE_ON
-                            self._attr_hvac_mode = HVACMode.HEAT
-                            # set temperature rangs
-                            self._attr_min_temp = TEMPERATURE_RANGES[self.hvac_mode][
-                                "min"
-                            ][self._unit_index]
-                            self._attr_max_temp = TEMPERATURE_RANGES[self.hvac_mode][
-                                "max"
-                            ][self._unit_index]
-                            # setting temperature based on mode
-                            if self._attr_hvac_mode == HVACMode.HEAT:
-                                self._attr_target_temperature = event.data["temp"]
-                            else:
-                                self._attr_target_temperature = None
-            self.async_write_ha_state()
-            await self.async_update_ha_state(True)
-
-        self.listener = self.hass.bus.async_listen(str(self.device_id), handle_event)
-        await self.api.protocol.sender.send_packet(self.update_packet)
+        def handle_event(feedback: Feedback):
+            """Handle the feedback."""
+            logging.info(f"floor heating feedback: {feedback}")
+            if feedback.channel == self.heater_number:
+                self._FEEDBACK_HANDLERS[type(feedback)](self, feedback)
+            async_write_state(self)
+
+        self.listener = async_subscribe_feedback(
+            self,
+            self.device_id,
+            ("floor_feedback", "floor_update"),
+            handle_event,
+            self.heater_number,
+        )
+        self.platform.config_entry.async_create_background_task(
+            self.hass,
+            async_request_update(self, self.update_packet),
+            f"{self.entity_id} state",
+        )
+
+    def _handle_floor_feedback(self, feedback: FloorFeedback) -> None:
+        """Apply a single setting reported by the heater."""
+        apply = self._FLOOR_SUB_OPERATIONS.get(feedback.sub_operation)
+        if apply is None:
+            logging.error(
+                f"Unknown sub operation for AC feedback: {feedback.sub_operation}"
+            )
+        else:
+            apply(self, feedback.value)
+
+    def _apply_power(self, value: int) -> None:
+        """Apply a power report, carrying the temperature when on."""
+        if value == 0x00:
+            # Turn off
+            self._attr_state = STATE_OFF
+            self._attr_hvac_mode = HVACMode.OFF
+            logging.info("Heater turned off")
+        else:
+            self._attr_state = STATE_ON
+            self._attr_hvac_mode = HVACMode.HEAT
+            self._attr_target_temperature = value
+            self._attr_current_temperature = value
+            logging.info(f"Heating mode temperature updated to {value}")
+
+    def _apply_temperature(self, value: int) -> None:
+        """Apply a temperature report."""
+        self._attr_target_temperature = value
+        self._attr_current_temperature = value
+
+    def _handle_floor_update(self, feedback: FloorUpdate) -> None:
+        """Apply every setting reported by the heater."""
+        if feedback.state == 0x00:
+            # turn off
+            self._attr_state = STATE_OFF
+            self._attr_hvac_mode = HVACMode.OFF
+            return
+        self._attr_state = STATE_ON
+        self._attr_hvac_mode = HVACMode.HEAT
+        # set temperature rangs
+        self._attr_min_temp, self._attr_max_temp = self._temperature_limits[
+            HVACMode.HEAT
+        ]
+        self._attr_target_temperature = feedback.temp
+
+    # floor_feedback sub operation -> setting it reports
+    _FLOOR_SUB_OPERATIONS = {
+        0x14: _apply_power,
+        0x18: _apply_temperature,
+    }
+    _FEEDBACK_HANDLERS = {
+        FloorFeedback: _handle_floor_feedback,
+        FloorUpdate: _handle_floor_update,
+    }
 
     # getters
     @property
@@ -602,7 +656,7 @@ class TISFloorHeating(ClimateEntity):
         packet = handler.generate_floor_on_off_packet(
             self, 0x00 if hvac_mode == HVACMode.OFF else 0x01
         )
-        await self.api.protocol.sender.send_packet(packet)
+        await async_send(self, packet, command_priority(self))
 
     async def async_set_temperature(self, **kwargs: Any) -> None:
         """Set new target temperature."""
@@ -610,8 +664,8 @@ class TISFloorHeating(ClimateEntity):
         packet = handler.generate_floor_on_off_packet(
             self, 0x00 if self._attr_state == STATE_OFF else 0x01
         )
-        await self.api.protocol.sender.send_packet(packet)
+        await async_send(self, packet, command_priority(self))
         packet = handler.generate_floor_set_temp_packet(
             self, int(new_target_temperature)
         )
-        await self.api.protocol.sender.send_packet_with_ack(packet)
+        await async_send_with_ack(self, packet)
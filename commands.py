@@ -0,0 +1,363 @@
+"""Sending control packets of TIS Control entities."""
+
+from __future__ import annotations
+
+import asyncio
+from collections import OrderedDict
+from collections.abc import Coroutine, Iterable
+import logging
+from typing import Any
+
+from TISControlProtocol.Protocols.udp.ProtocolHandler import (
+    TISPacket,
+    TISProtocolHandler,
+)
+
+from homeassistant.helpers.entity import Entity
+
+from .channels import BROADCAST_CHANNEL, ChannelStateStore
+from .const import (
+    CONF_OPTIMISTIC,
+    DEFAULT_OPTIMISTIC,
+    MAX_RAMP_TIME,
+    RAMP_TIME_MODELS,
+    SOFTWARE_TRANSITION_RATE,
+)
+from .scheduler import PRIORITY_POLLING, async_request_update, async_send_with_ack
+
+_LOGGER = logging.getLogger(__name__)
+
+PACKET_CACHE_SIZE = 512
+
+async def async_send_channel_packets(
+    entity: Entity, packets: Iterable[TISPacket]
+) -> dict[int, bool]:
+    """Send the control packets of several channels concurrently.
+
+    Acks are tracked per channel, so the packets of different channels of a
+    device can be in flight together and a change costs about one round
+    trip. Returns whether each channel acknowledged its packet.
+    """
+    packets = list(packets)
+    channels = [int(packet.additional_bytes[0]) for packet in packets]
+    results = await asyncio.gather(
+        # the sender drops a packet following the previous one of the channel
+        # within its debounce time, every channel here is meant to be sent
+        *(async_send_with_ack(entity, packet, debounce_time=0) for packet in packets),
+        return_exceptions=True,
+    )
+    acks = {}
+    for channel, result in zip(channels, results, strict=True):
+        if isinstance(result, BaseException):
+            _LOGGER.error("Error sending packet, channel: %s: %s", channel, result)
+            result = False
+        acks[channel] = bool(result)
+    if failed := [channel for channel, ack in acks.items() if not ack]:
+        _LOGGER.error(
+            "No ack from device %s, channels: %s of %s",
+            entity.device_id,
+            failed,
+            channels,
+        )
+    return acks
+
+
+class PacketCache:
+    """Bounded LRU cache of control packets shared by every entity.
+
+    Building a packet computes its checksum, scenes and sliders that send
+    the same levels again reuse the packet built the first time.
+    """
+
+    def __init__(self, maxsize: int = PACKET_CACHE_SIZE) -> None:
+        """Initialize the cache."""
+        self.maxsize = maxsize
+        self._packets: OrderedDict[tuple, TISPacket] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def control_packet(
+        self, entity: Entity, channel: int, level: int, ramp_time: int = 0
+    ) -> TISPacket:
+        """Return the packet setting a channel of the entity's device to a level.
+
+        ramp_time is the time in seconds the device takes to fade to it.
+        """
+        key = (tuple(entity.device_id), entity.gateway, channel, level, ramp_time)
+        packet = self._packets.get(key)
+        if packet is not None:
+            self.hits += 1
+            self._packets.move_to_end(key)
+            return packet
+        self.misses += 1
+        packet = self._packets[key] = TISPacket(
+            device_id=entity.device_id,
+            operation_code=TISProtocolHandler.OPERATION_CONTROL,
+            source_ip=entity.api.host,
+            destination_ip=entity.gateway,
+            additional_bytes=[channel, level, *divmod(ramp_time, 60)],
+        )
+        if len(self._packets) > self.maxsize:
+            self._packets.popitem(last=False)
+        return packet
+
+    def as_dict(self) -> dict:
+        """Return the cache statistics."""
+        return {
+            "size": len(self._packets),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+def channel_control_packet(
+    entity: Entity, channel: int, level: int, ramp_time: int = 0
+) -> TISPacket:
+    """Return the packet setting a channel of the entity's device to a level."""
+    packet_cache: PacketCache = entity.platform.config_entry.runtime_data.packet_cache
+    return packet_cache.control_packet(entity, channel, level, ramp_time)
+
+
+def light_control_packet(entity: Entity, level: int, ramp_time: int = 0) -> TISPacket:
+    """Return the packet setting the channel of a single channel entity."""
+    return channel_control_packet(entity, entity.channel_number, level, ramp_time)
+
+
+def ramp_time(transition: float | None) -> int:
+    """Return the ramp time field of a control packet for a transition."""
+    if not transition:
+        return 0
+    return min(MAX_RAMP_TIME, max(0, round(transition)))
+
+
+def supports_ramp_time(entity: Entity) -> bool:
+    """Return whether the entity's device fades over the ramp time itself.
+
+    Only a model discovery reported and known not to fade gets a software
+    fade, every other device is sent the ramp time of the packet.
+    """
+    channel_states: ChannelStateStore = (
+        entity.platform.config_entry.runtime_data.channel_states
+    )
+    model = channel_states.model(entity.device_id)
+    return model is None or model in RAMP_TIME_MODELS
+
+
+async def async_send_channel_levels(
+    entity: Entity, levels: dict[int, int], ramp_time: int = 0
+) -> dict[int, bool]:
+    """Set several channels of the entity's device, in as few frames as possible.
+
+    A TIS control frame carries the level of a single channel. A change
+    setting every channel of the device to one level, like turning off a
+    light that has the device to itself, is sent as one frame on the
+    broadcast channel and acknowledged once. That needs the model of the
+    device from discovery: the broadcast frame also switches channels the
+    configuration does not use, which may drive loads of their own. Any
+    other change, a color with different levels included, and every change
+    before discovery reported the model, sends one packet per channel,
+    concurrently.
+    """
+    channel_states: ChannelStateStore = (
+        entity.platform.config_entry.runtime_data.channel_states
+    )
+    model_channels = channel_states.model_channels(entity.device_id)
+    if (
+        model_channels
+        and len(set(levels.values())) == 1
+        and levels.keys() == model_channels
+    ):
+        level = next(iter(levels.values()))
+        ack = await async_send_channel_packets(
+            entity,
+            [channel_control_packet(entity, BROADCAST_CHANNEL, level, ramp_time)],
+        )
+        return dict.fromkeys(levels, ack[BROADCAST_CHANNEL])
+    return await async_send_channel_packets(
+        entity,
+        [
+            channel_control_packet(entity, channel, level, ramp_time)
+            for channel, level in levels.items()
+        ],
+    )
+
+
+async def async_set_all_channels(entity: Entity, level: int) -> bool:
+    """Set every channel of the entity's device with a single broadcast frame.
+
+    The device answers on the broadcast channel, the feedback of that
+    answer updates every channel entity of the device.
+    """
+    acks = await async_send_channel_packets(
+        entity, [channel_control_packet(entity, BROADCAST_CHANNEL, level)]
+    )
+    return acks[BROADCAST_CHANNEL]
+
+
+class CommandCoalescer:
+    """Send the control packets of an entity one at a time, the latest wins.
+
+    While a packet waits for its ack, newer packets replace the pending one
+    and only the last of them is sent once the ack arrives. Dragging a
+    slider therefore sends the first and the final value instead of
+    queueing every intermediate one. Superseded packets resolve to None.
+    """
+
+    def __init__(self, entity: Entity) -> None:
+        """Initialize the coalescer."""
+        self.entity = entity
+        self._in_flight = False
+        self._pending: tuple[TISPacket, asyncio.Future[bool | None]] | None = None
+        self.sent = 0
+        self.superseded = 0
+        # changes with every command, a running fade stops when it does
+        self.generation = 0
+
+    async def _async_send(self, packet: TISPacket) -> bool:
+        self.sent += 1
+        # the sender drops packets following the previous one of the channel
+        # within its debounce time, that would drop the final value here
+        ack = await async_send_with_ack(self.entity, packet, debounce_time=0)
+        return bool(ack)
+
+    async def async_send_with_ack(self, packet: TISPacket) -> bool | None:
+        """Send a packet, return its ack or None if a newer packet replaced it."""
+        self.generation += 1
+        if self._in_flight:
+            if self._pending is not None:
+                self.superseded += 1
+                self._pending[1].set_result(None)
+            future = asyncio.get_running_loop().create_future()
+            self._pending = (packet, future)
+            return await future
+
+        self._in_flight = True
+        future = None
+        try:
+            ack = await self._async_send(packet)
+            while self._pending is not None:
+                (packet, future), self._pending = self._pending, None
+                try:
+                    result = await self._async_send(packet)
+                except Exception as err:  # noqa: BLE001
+                    if not future.done():
+                        future.set_exception(err)
+                else:
+                    if not future.done():
+                        future.set_result(result)
+        except BaseException as err:
+            # the packets waiting behind the failed send fail the same way
+            for pending in (future, self._pending and self._pending[1]):
+                if pending is not None and not pending.done():
+                    pending.set_exception(err)
+            raise
+        finally:
+            self._in_flight = False
+            self._pending = None
+        return ack
+
+
+def is_optimistic(entity: Entity) -> bool:
+    """Return whether commands of the entity update its state before the ack."""
+    return entity.platform.config_entry.options.get(CONF_OPTIMISTIC, DEFAULT_OPTIMISTIC)
+
+
+def _set_attributes(entity: Entity, attributes: dict[str, Any]) -> None:
+    for name, value in attributes.items():
+        setattr(entity, name, value)
+
+
+async def async_run_command(
+    entity: Entity,
+    send: Coroutine[Any, Any, bool | None],
+    on_ack: dict[str, Any],
+    on_failure: dict[str, Any],
+) -> None:
+    """Send a command and apply its outcome to the attributes of the entity.
+
+    send resolves to the ack of the command or None when a newer command
+    replaced it. In optimistic mode on_ack is written before the command is
+    sent and the command runs in the background. The previous values come
+    back if it is not acknowledged, once it is the state the device
+    reports replaces on_ack.
+    """
+    if not is_optimistic(entity):
+        ack = await send
+        if ack is None:
+            # a newer command replaced this one, it sets the state
+            return
+        if not ack:
+            _LOGGER.error("No ack for %s", entity.entity_id)
+        _set_attributes(entity, on_ack if ack else on_failure)
+        entity.async_write_ha_state()
+        return
+
+    previous = {name: getattr(entity, name) for name in on_ack}
+    _set_attributes(entity, on_ack)
+    entity.async_write_ha_state()
+    entity.platform.config_entry.async_create_background_task(
+        entity.hass,
+        _async_reconcile(entity, send, on_ack, previous),
+        f"{entity.entity_id} command",
+    )
+
+
+async def _async_reconcile(
+    entity: Entity,
+    send: Coroutine[Any, Any, bool | None],
+    on_ack: dict[str, Any],
+    previous: dict[str, Any],
+) -> None:
+    """Replace an optimistic state by the one the device reports.
+
+    The reply to the update request reaches the feedback handlers of the
+    entity, which write the state of the device over the optimistic one.
+    Without an ack the previous state comes back.
+    """
+    ack = await send
+    if ack:
+        await async_request_update(entity, entity.update_packet, PRIORITY_POLLING)
+        return
+    if ack is None:
+        # a newer command replaced this one, it reconciles the state
+        return
+    # a newer command or feedback of the device changed the state meanwhile
+    if any(getattr(entity, name) != value for name, value in on_ack.items()):
+        return
+    _LOGGER.warning("No ack for %s, reverting to %s", entity.entity_id, previous)
+    _set_attributes(entity, previous)
+    entity.async_write_ha_state()
+
+
+async def async_software_transition(
+    entity: Entity,
+    commands: CommandCoalescer,
+    start: int,
+    target: int,
+    transition: float,
+) -> bool | None:
+    """Fade the channel of a single channel entity in steps.
+
+    For devices that ignore the ramp time. Steps are at most
+    SOFTWARE_TRANSITION_RATE per second and one level apart at least, the
+    fade stops when another command of the entity is sent. Returns the ack
+    of the last step sent, None when another command took over.
+    """
+    steps = max(1, min(int(transition * SOFTWARE_TRANSITION_RATE), abs(target - start)))
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    # stops a fade still running on the entity
+    commands.generation += 1
+    generation = commands.generation
+    ack: bool | None = True
+    for step in range(1, steps + 1):
+        await asyncio.sleep(started + transition * step / steps - loop.time())
+        if commands.generation != generation:
+            return None
+        level = start + (target - start) * step // steps
+        generation = commands.generation + 1
+        ack = await commands.async_send_with_ack(light_control_packet(entity, level))
+        if not ack:
+            return ack
+    return ack
@@ -36,11 +36,24 @@ import logging
 
 import voluptuous as vol
 
-from homeassistant.config_entries import ConfigFlow, ConfigFlowResult
+from homeassistant.config_entries import (
+    ConfigEntry,
+    ConfigFlow,
+    ConfigFlowResult,
+    OptionsFlow,
+)
 from homeassistant.const import CONF_PORT
 from homeassistant.core import callback
 
-from .const import DOMAIN
+from .const import (
+    CONF_MAX_FRAME_RATE,
+    CONF_OPTIMISTIC,
+    CONF_WRITE_FLUSH_WINDOW,
+    DEFAULT_MAX_FRAME_RATE,
+    DEFAULT_OPTIMISTIC,
+    DEFAULT_WRITE_FLUSH_WINDOW,
+    DOMAIN,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -52,6 +65,12 @@ class TISConfigFlow(ConfigFlow, domain=DOMAIN):
 
     VERSION = 1
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry: ConfigEntry) -> OptionsFlow:
+        """Get the options flow for this handler."""
+        return TISOptionsFlow()
+
     async def async_step_user(self, user_input: dict | None = None) -> ConfigFlowResult:
         """Handle a flow initiated by the user."""
         errors = {}
@@ -90,3 +109,38 @@ class TISConfigFlow(ConfigFlow, domain=DOMAIN):
             if 1 <= port <= 65535:
                 return True
         return False
+
+
+class TISOptionsFlow(OptionsFlow):
+    """Handle TISControl options."""
+
+    async def async_step_init(self, user_input: dict | None = None) -> ConfigFlowResult:
+        """Manage the options."""
+        if user_input is not None:
+            return self.async_create_entry(data=user_input)
+
+        return self.async_show_form(
+            step_id="init",
+            data_schema=vol.Schema(
+                {
+                    vol.Required(
+                        CONF_WRITE_FLUSH_WINDOW,
+                        default=self.config_entry.options.get(
+                            CONF_WRITE_FLUSH_WINDOW, DEFAULT_WRITE_FLUSH_WINDOW
+                        ),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=0, max=1000)),
+                    vol.Required(
+                        CONF_MAX_FRAME_RATE,
+                        default=self.config_entry.options.get(
+                            CONF_MAX_FRAME_RATE, DEFAULT_MAX_FRAME_RATE
+                        ),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=0, max=1000)),
+                    vol.Required(
+                        CONF_OPTIMISTIC,
+                        default=self.config_entry.options.get(
+                            CONF_OPTIMISTIC, DEFAULT_OPTIMISTIC
+                        ),
+                    ): bool,
+                }
+            ),
+        )
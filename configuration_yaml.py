@@ -0,0 +1,75 @@
+"""Settings the integration adds to the Home Assistant configuration.yaml."""
+
+from __future__ import annotations
+
+import hashlib
+import io
+import logging
+import os
+import time
+
+from ruamel.yaml import YAML
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+
+from . import tis_configuration_dashboard
+from .const import DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../"))
+HTTP_SETTINGS = {"use_x_forwarded_for": True, "trusted_proxies": ["172.30.33.0/24"]}
+STORAGE_VERSION = 1
+STORAGE_KEY = f"{DOMAIN}.configuration_yaml"
+
+
+def patch_configuration(base_dir: str, known_hash: str | None) -> str | None:
+    """Add the dashboard and the http settings to configuration.yaml.
+
+    Runs in the executor. The file is parsed once and only written when a
+    setting was missing. A file whose hash is known_hash was patched by an
+    earlier start and is neither parsed nor written. Returns the hash of
+    the patched file, None when it could not be patched.
+    """
+    config_path = os.path.join(base_dir, "configuration.yaml")
+    yaml = YAML()
+    yaml.preserve_quotes = True
+    try:
+        with open(config_path, "rb") as f:
+            contents = f.read()
+        digest = hashlib.sha256(contents).hexdigest()
+        if digest != known_hash:
+            config = yaml.load(contents)
+            changed = tis_configuration_dashboard.add_dashboard(config)
+            if config.get("http") != HTTP_SETTINGS:
+                _LOGGER.warning("Adding HTTP configuration to configuration.yaml")
+                config["http"] = HTTP_SETTINGS
+                changed = True
+            if changed:
+                buffer = io.BytesIO()
+                yaml.dump(config, buffer)
+                contents = buffer.getvalue()
+                with open(config_path, "wb") as f:
+                    f.write(contents)
+                digest = hashlib.sha256(contents).hexdigest()
+    except Exception as e:  # noqa: BLE001
+        _LOGGER.error("Error patching configuration.yaml: %s", e)
+        return None
+    tis_configuration_dashboard.create(base_dir, yaml)
+    return digest
+
+
+async def async_patch_configuration(hass: HomeAssistant) -> None:
+    """Patch configuration.yaml in the executor, remembering its hash."""
+    store: Store[dict[str, str]] = Store(hass, STORAGE_VERSION, STORAGE_KEY)
+    known_hash = (await store.async_load() or {}).get("sha256")
+    started = time.perf_counter()
+    digest = await hass.async_add_executor_job(
+        patch_configuration, BASE_DIR, known_hash
+    )
+    elapsed = (time.perf_counter() - started) * 1000
+    parsed = "not parsed" if digest == known_hash else "parsed"
+    _LOGGER.info("configuration.yaml checked in %.1f ms, %s", elapsed, parsed)
+    if digest is not None and digest != known_hash:
+        await store.async_save({"sha256": digest})
@@ -14,6 +14,19 @@ from homeassistant.components.climate import (
 
 DOMAIN = "tis_control"
 
+# options
+CONF_WRITE_FLUSH_WINDOW = "write_flush_window"
+DEFAULT_WRITE_FLUSH_WINDOW = 0  # milliseconds, 0 flushes once per loop iteration
+CONF_MAX_FRAME_RATE = "max_frame_rate"
+DEFAULT_MAX_FRAME_RATE = 0  # frames per second per gateway, 0 is uncapped
+CONF_OPTIMISTIC = "optimistic"
+DEFAULT_OPTIMISTIC = False
+
+# services
+SERVICE_SET_ALL_CHANNELS = "set_all_channels"
+SERVICE_BULK_COMMAND = "bulk_command"
+ATTR_LEVEL = "level"
+
 DEVICES_DICT = {
     (0x1B, 0xBA): "RCU-8OUT-8IN",
     (0x0B, 0xE9): "SEC-SM",
@@ -33,6 +46,33 @@ DEVICES_DICT = {
     (0x01, 0xAA): "TIS-VLC-6CH-3A",
 }
 
+# dimmers that fade to a new level over the ramp time of a control packet
+RAMP_TIME_MODELS = frozenset(
+    {
+        "DIM-2CH-6A",
+        "DIM-6CH-2A",
+        "TIS-TE-DIM-4CH-1A",
+        "TIS-VLC-12CH-10A",
+        "TIS-VLC-6CH-3A",
+    }
+)
+MAX_RAMP_TIME = 3600  # seconds
+# steps per second of transitions faded by the integration
+SOFTWARE_TRANSITION_RATE = 4
+
+# number of output channels of the models in DEVICES_DICT
+MODEL_CHANNELS = {
+    "RCU-8OUT-8IN": 8,
+    "RLY-4CH-10": 4,
+    "DIM-2CH-6A": 2,
+    "DIM-6CH-2A": 6,
+    "24R20Z": 24,
+    "TIS-TE-DIM-4CH-1A": 4,
+    "TIS-RCU-20OUT-20IN": 20,
+    "TIS-VLC-12CH-10A": 12,
+    "TIS-VLC-6CH-3A": 6,
+}
+
 TEMPERATURE_RANGES = {
     HVACMode.COOL: {
         "min": (15.0, 59.0),
@@ -73,6 +113,23 @@ FAN_MODES = {
     FAN_LOW: 3,
 }
 
+# reverse lookups of the packet values reported by AC feedback, modes
+# sharing a packet_mode_index resolve to the first one listed above
+PACKET_HVAC_MODES = {
+    settings["packet_mode_index"]: hvac_mode
+    for hvac_mode, settings in reversed(TEMPERATURE_RANGES.items())
+}
+PACKET_FAN_MODES = {value: fan_mode for fan_mode, value in FAN_MODES.items()}
+
+# (min, max) temperature of every HVAC mode, indexed by unit (0 C, 1 F)
+TEMPERATURE_LIMITS = tuple(
+    {
+        hvac_mode: (settings["min"][unit_index], settings["max"][unit_index])
+        for hvac_mode, settings in TEMPERATURE_RANGES.items()
+    }
+    for unit_index in (0, 1)
+)
+
 ENERGY_SENSOR_TYPES = {
     "v1": "Voltage Phase 1",
     "v2": "Voltage Phase 2",
@@ -12,6 +12,8 @@ from TISControlProtocol.Protocols.udp.ProtocolHandler import (
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
 
+from .scheduler import PRIORITY_POLLING, SendScheduler
+
 _LOGGER = logging.getLogger(__name__)
 HANDLER = TISProtocolHandler()
 
@@ -41,4 +43,5 @@ class SensorUpdateCoordinator(DataUpdateCoordinator):
     async def _async_update_data(self) -> bool:
         """Fetch data from API."""
         # Here you should return the data fetched from the API
-        return await self.api.protocol.sender.send_packet(self.update_packet)
+        send_scheduler: SendScheduler = self.config_entry.runtime_data.send_scheduler
+        return await send_scheduler.async_send(self.update_packet, PRIORITY_POLLING)
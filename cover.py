@@ -19,12 +19,21 @@ from homeassistant.components.cover import (
     CoverEntityFeature,
 )
 from homeassistant.const import STATE_CLOSING, STATE_OPENING, STATE_UNKNOWN, Platform
-from homeassistant.core import Event, HomeAssistant, callback
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
 from . import TISConfigEntry
+from .channels import ChannelStateStore
+from .commands import CommandCoalescer, async_run_command, light_control_packet
+from .dispatcher import async_subscribe_feedback
+from .feedback import ControlResponse, Feedback, OfflineDevice, UpdateResponse
+from .scheduler import async_request_update, async_send_with_ack
+from .snapshot import RESTORED_ATTRIBUTES
+from .state_writer import async_schedule_write, async_write_state
 
 handler = TISProtocolHandler()
+# position and state of a cover whose command was not acknowledged
+FAILED_COMMAND = {"_attr_is_closed": None, "_attr_current_cover_position": None}
 
 
 async def async_setup_entry(
@@ -35,8 +44,8 @@ async def async_setup_entry(
     """Set up TIS Control lights."""
     tis_api: TISApi = entry.runtime_data.api
     # Fetch all covers from the TIS API
-    covers_w_pos: dict = await tis_api.get_entities(platform="motor")
-    covers: dict = await tis_api.get_entities(platform="shutter")
+    covers_w_pos: dict = entry.runtime_data.catalog.entities("motor")
+    covers: dict = entry.runtime_data.catalog.entities("shutter")
 
     if covers_w_pos:
         # Prepare a list of tuples containing necessary cover details
@@ -121,49 +130,71 @@ class TISCoverWPos(CoverEntity):
         self._attr_device_class = CoverDeviceClass.SHUTTER
         self._attr_unique_id = f"{self._attr_name}_{self.channel_number}"
         self.listener = None
+        self.channel_states: ChannelStateStore | None = None
+        self.commands = CommandCoalescer(self)
         ##############################################
         self.update_packet: TISPacket = handler.generate_control_update_packet(self)
-        self.generate_cover_packet = handler.generate_light_control_packet
+        self.generate_cover_packet = light_control_packet
 
     async def async_added_to_hass(self) -> None:
         """Run when entity about to be added to hass."""
 
         @callback
-        async def handle_event(event: Event):
-            """Handle the event."""
-            # check if event is for this switch
-            if event.event_type == str(self.device_id):
-                if event.data["feedback_type"] == "control_response":
-                    logging.info(f"channel number for cover: {self.channel_number}")
-                    channel_value = event.data["additional_bytes"][2]
-                    channel_number = event.data["channel_number"]
-                    if int(channel_number) == self.channel_number:
-                        # Convert the received position if needed
-                        position = channel_value
-                        if self.exchange_command == "1":
-                            position = 100 - position
-                        self._attr_is_closed = position == 0
-                        self._attr_current_cover_position = position
-                    self.async_write_ha_state()
-                elif event.data["feedback_type"] == "update_response":
-                    additional_bytes = event.data["additional_bytes"]
-                    position = additional_bytes[self.channel_number]
-                    if self.exchange_command == "1":
-                        position = 100 - position
-                    self._attr_current_cover_position = position
-                    self._attr_is_closed = self._attr_current_cover_position == 0
-                    self._attr_state = (
-                        STATE_CLOSING if self._attr_is_closed else STATE_OPENING
-                    )
-                elif event.data["feedback_type"] == "offline_device":
-                    self._attr_state = STATE_UNKNOWN
-                    self._attr_is_closed = None
-                    self._attr_current_cover_position = None
-
-            await self.async_update_ha_state(True)
-
-        self.listener = self.hass.bus.async_listen(str(self.device_id), handle_event)
-        _ = await self.api.protocol.sender.send_packet(self.update_packet)
+        def handle_event(feedback: Feedback):
+            """Handle the feedback."""
+            level = self.channel_states.get(self.device_id, self.channel_number)
+            self._FEEDBACK_HANDLERS[type(feedback)](self, level)
+            self._attr_extra_state_attributes = None
+            async_schedule_write(self)
+
+        self.channel_states = self.platform.config_entry.runtime_data.channel_states
+        self.channel_states.register(self.device_id, self.channel_number)
+        # start from the position saved by the last run until the device answers
+        if self.channel_states.is_restored(self.device_id):
+            self._apply_update_response(
+                self.channel_states.get(self.device_id, self.channel_number)
+            )
+            self._attr_extra_state_attributes = RESTORED_ATTRIBUTES
+        self.listener = async_subscribe_feedback(
+            self,
+            self.device_id,
+            ("control_response", "update_response", "offline_device"),
+            handle_event,
+            self.channel_number,
+        )
+        self.platform.config_entry.async_create_background_task(
+            self.hass,
+            async_request_update(self, self.update_packet),
+            f"{self.entity_id} state",
+        )
+
+    def _apply_control_response(self, level: int | None) -> None:
+        """Apply the position reported after a control command."""
+        logging.info(f"channel number for cover: {self.channel_number}")
+        # Convert the received position if needed
+        position = self._convert_position(level)
+        self._attr_is_closed = position == 0
+        self._attr_current_cover_position = position
+
+    def _apply_update_response(self, level: int | None) -> None:
+        """Apply the position reported by a state update."""
+        if level is not None:
+            position = self._convert_position(level)
+            self._attr_current_cover_position = position
+            self._attr_is_closed = self._attr_current_cover_position == 0
+            self._attr_state = STATE_CLOSING if self._attr_is_closed else STATE_OPENING
+
+    def _apply_offline_device(self, level: int | None) -> None:
+        """Mark the cover unknown after an unacknowledged command."""
+        self._attr_state = STATE_UNKNOWN
+        self._attr_is_closed = None
+        self._attr_current_cover_position = None
+
+    _FEEDBACK_HANDLERS = {
+        ControlResponse: _apply_control_response,
+        UpdateResponse: _apply_update_response,
+        OfflineDevice: _apply_offline_device,
+    }
 
     def _convert_position(self, position: int) -> int:
         """Convert position based on exchange_command flag."""
@@ -201,28 +232,24 @@ class TISCoverWPos(CoverEntity):
         # For open, we want position 100, but if exchanged, we send 0
         send_position = self._convert_position(100)
         packet = self.generate_cover_packet(self, send_position)
-        ack_status = await self.api.protocol.sender.send_packet_with_ack(packet)
-        if ack_status:
-            self._attr_is_closed = False
-            self._attr_current_cover_position = 100
-        else:
-            self._attr_is_closed = None
-            self._attr_current_cover_position = None
-        self.async_write_ha_state()
+        await async_run_command(
+            self,
+            self.commands.async_send_with_ack(packet),
+            {"_attr_is_closed": False, "_attr_current_cover_position": 100},
+            FAILED_COMMAND,
+        )
 
     async def async_close_cover(self, **kwargs: Any) -> None:
         """Close cover."""
         # For close, we want position 0, but if exchanged, we send 100
         send_position = self._convert_position(0)
         packet = self.generate_cover_packet(self, send_position)
-        ack_status = await self.api.protocol.sender.send_packet_with_ack(packet)
-        if ack_status:
-            self._attr_is_closed = True
-            self._attr_current_cover_position = 0
-        else:
-            self._attr_is_closed = None
-            self._attr_current_cover_position = None
-        self.async_write_ha_state()
+        await async_run_command(
+            self,
+            self.commands.async_send_with_ack(packet),
+            {"_attr_is_closed": True, "_attr_current_cover_position": 0},
+            FAILED_COMMAND,
+        )
 
     async def async_set_cover_position(self, **kwargs: Any) -> None:
         """Move the cover to a specific position."""
@@ -230,18 +257,15 @@ class TISCoverWPos(CoverEntity):
         # Convert the position before sending to the device
         send_position = self._convert_position(position)
         packet = self.generate_cover_packet(self, send_position)
-        ack_status = await self.api.protocol.sender.send_packet_with_ack(packet)
-        if ack_status:
-            self._attr_is_closed = (
-                send_position <= 20
-                if self.exchange_command == "0"
-                else send_position >= 80
-            )
-            self._attr_current_cover_position = position
-        else:
-            self._attr_is_closed = None
-            self._attr_current_cover_position = None
-        self.async_write_ha_state()
+        is_closed = (
+            send_position <= 20 if self.exchange_command == "0" else send_position >= 80
+        )
+        await async_run_command(
+            self,
+            self.commands.async_send_with_ack(packet),
+            {"_attr_is_closed": is_closed, "_attr_current_cover_position": position},
+            FAILED_COMMAND,
+        )
 
 
 class TISCoverNoPos(CoverEntity):
@@ -277,37 +301,32 @@ class TISCoverNoPos(CoverEntity):
         """Subscribe to events."""
 
         @callback
-        async def handle_event(event: Event):
-            """Handle the event."""
-            # check if event is for this switch
-            if event.event_type == str(self.device_id):
-                if event.data["feedback_type"] == "control_response":
-                    channel_value = event.data["additional_bytes"][2]
-                    channel_number = event.data["channel_number"]
-                    if int(channel_number) == self.up_channel_number:
-                        if channel_value != 0:
-                            self._attr_is_closed = False
-                            self.last_state = STATE_OPENING
-                            self._attr_state = STATE_OPENING
-                            logging.info(f"up channel value: {channel_value} 'opening'")
-                    elif int(channel_number) == self.down_channel_number:
-                        if channel_value != 0:
-                            self._attr_is_closed = True
-                            self._attr_state = STATE_CLOSING
-                            self.last_state = STATE_CLOSING
-                            logging.info(
-                                f"down channel value: {channel_value} 'closing'"
-                            )
-                    else:
-                        logging.info(f"channel number: {channel_number} 'stopping'")
-                        self._attr_state = self.last_state
-                        self._attr_is_closed = (
-                            False if self.last_state == STATE_OPENING else True
-                        )
-            await self.async_update_ha_state(True)
-            self.schedule_update_ha_state()
-
-        self.listener = self.hass.bus.async_listen(str(self.device_id), handle_event)
+        def handle_event(feedback: ControlResponse):
+            """Handle the feedback."""
+            channel_value = feedback.level
+            if feedback.channel == self.up_channel_number:
+                if channel_value != 0:
+                    self._attr_is_closed = False
+                    self.last_state = STATE_OPENING
+                    self._attr_state = STATE_OPENING
+                    logging.info(f"up channel value: {channel_value} 'opening'")
+            elif feedback.channel == self.down_channel_number:
+                if channel_value != 0:
+                    self._attr_is_closed = True
+                    self._attr_state = STATE_CLOSING
+                    self.last_state = STATE_CLOSING
+                    logging.info(f"down channel value: {channel_value} 'closing'")
+            else:
+                # any other channel of the motor module reports a stop
+                logging.info(f"channel number: {feedback.channel} 'stopping'")
+                self._attr_state = self.last_state
+                self._attr_is_closed = self.last_state != STATE_OPENING
+            async_write_state(self)
+
+        # every channel of the device, the handler tells them apart
+        self.listener = async_subscribe_feedback(
+            self, self.device_id, ("control_response",), handle_event
+        )
 
     @property
     def name(self) -> str:
@@ -341,7 +360,7 @@ class TISCoverNoPos(CoverEntity):
         """Open the cover."""
         up_packet, down_packet = handler.generate_no_pos_cover_packet(self, "open")
         # we only need to send the up packet here
-        ack_status = await self.api.protocol.sender.send_packet_with_ack(up_packet)
+        ack_status = await async_send_with_ack(self, up_packet)
         if ack_status:
             logging.info("up packet sent 'opening'")
             self._attr_is_closed = False
@@ -357,7 +376,7 @@ class TISCoverNoPos(CoverEntity):
         """Close cover."""
         up_packet, down_packet = handler.generate_no_pos_cover_packet(self, "close")
         # we only need to send the down packet here
-        ack_status = await self.api.protocol.sender.send_packet_with_ack(down_packet)
+        ack_status = await async_send_with_ack(self, down_packet)
         if ack_status:
             logging.info("down packet sent 'closing'")
             self._attr_is_closed = True
@@ -374,9 +393,7 @@ class TISCoverNoPos(CoverEntity):
         up_packet, down_packet = handler.generate_no_pos_cover_packet(self, "stop")
         # we need to send both packets here
         if self._attr_is_closed:
-            ack_status = await self.api.protocol.sender.send_packet_with_ack(
-                down_packet
-            )
+            ack_status = await async_send_with_ack(self, down_packet)
             if ack_status:
                 logging.info("down packet sent 'stopping'")
                 self._attr_state = self.last_state
@@ -389,7 +406,7 @@ class TISCoverNoPos(CoverEntity):
                 self._attr_is_closed = None
 
         elif not self._attr_is_closed:
-            ack_status = await self.api.protocol.sender.send_packet_with_ack(up_packet)
+            ack_status = await async_send_with_ack(self, up_packet)
             if ack_status:
                 logging.info("up packet sent 'stopping'")
                 self._attr_state = self.last_state
@@ -0,0 +1,26 @@
+"""Diagnostics support for TISControl."""
+
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.core import HomeAssistant
+
+from . import TISConfigEntry
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: TISConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    return {
+        "options": dict(entry.options),
+        "catalog": entry.runtime_data.catalog.as_dict(),
+        "state_writes": entry.runtime_data.state_writer.as_dict(),
+        "send_queues": entry.runtime_data.send_scheduler.as_dict(),
+        "packet_cache": entry.runtime_data.packet_cache.as_dict(),
+        "snapshot": entry.runtime_data.snapshot.as_dict(),
+        "ack_round_trips": (
+            entry.runtime_data.send_scheduler.round_trip_times.as_dict()
+        ),
+    }
@@ -0,0 +1,132 @@
+"""Feedback dispatcher for TIS Control entities."""
+
+from __future__ import annotations
+
+from collections.abc import Callable, Iterable
+from typing import Any
+
+from homeassistant.core import CALLBACK_TYPE, Event, HassJob, HomeAssistant, callback
+from homeassistant.helpers.entity import Entity
+
+from .channels import BROADCAST_CHANNEL, ChannelStateStore
+from .feedback import CHANNEL_FEEDBACK_TYPES, Feedback, parse_feedback
+
+
+class FeedbackDispatcher:
+    """Route TIS feedback events to the entities subscribed to them.
+
+    A single bus listener is registered per device and subscribers are
+    indexed by (feedback_type, channel), so a packet only reaches the
+    entities it is addressed to. Each event is parsed into its feedback
+    record once, applied to the channel state store and then passed to the
+    subscribers.
+    """
+
+    def __init__(self, hass: HomeAssistant, channel_states: ChannelStateStore) -> None:
+        """Initialize the dispatcher."""
+        self.hass = hass
+        self.channel_states = channel_states
+        self._subscribers: dict[str, dict[tuple[str, int | None], tuple[HassJob]]] = {}
+        self._listeners: dict[str, CALLBACK_TYPE] = {}
+
+    @callback
+    def async_subscribe(
+        self,
+        device_id: list[int],
+        feedback_types: Iterable[str],
+        target: Callable[[Feedback], Any],
+        channel: int | None = None,
+    ) -> CALLBACK_TYPE:
+        """Subscribe target to the given feedback types of a device.
+
+        Channel specific feedback is only delivered for the given channel,
+        or for every channel without one. Device wide feedback and feedback
+        of the broadcast channel are always delivered.
+        """
+        event_type = str(list(device_id))
+        index = self._subscribers.get(event_type)
+        if index is None:
+            index = self._subscribers[event_type] = {}
+            self._listeners[event_type] = self.hass.bus.async_listen(
+                event_type, self._async_handle_event
+            )
+
+        job = HassJob(target, f"TIS feedback {event_type}")
+        keys = [
+            (
+                feedback_type,
+                int(channel)
+                if channel is not None and feedback_type in CHANNEL_FEEDBACK_TYPES
+                else None,
+            )
+            for feedback_type in feedback_types
+        ]
+        for key in keys:
+            index[key] = (*index.get(key, ()), job)
+
+        @callback
+        def async_unsubscribe() -> None:
+            """Remove the subscription."""
+            for key in keys:
+                jobs = tuple(j for j in index.get(key, ()) if j is not job)
+                if jobs:
+                    index[key] = jobs
+                else:
+                    index.pop(key, None)
+            if not index and self._subscribers.get(event_type) is index:
+                del self._subscribers[event_type]
+                self._listeners.pop(event_type)()
+
+        return async_unsubscribe
+
+    @callback
+    def _async_handle_event(self, event: Event) -> None:
+        """Deliver an event to the matching subscribers."""
+        index = self._subscribers.get(event.event_type)
+        if not index:
+            return
+        feedback = parse_feedback(event)
+        if feedback is None:
+            return
+        self.channel_states.async_process_feedback(feedback)
+        feedback_type = event.data.get("feedback_type")
+        if feedback_type in CHANNEL_FEEDBACK_TYPES:
+            if feedback.channel == BROADCAST_CHANNEL:
+                # a broadcast frame changed every channel of the device
+                keys = [
+                    key
+                    for key in index
+                    if key[0] == feedback_type and key[1] is not None
+                ]
+            else:
+                keys = [(feedback_type, feedback.channel)]
+            for key in keys:
+                for job in index.get(key, ()):
+                    self.hass.async_run_hass_job(job, feedback)
+        for job in index.get((feedback_type, None), ()):
+            self.hass.async_run_hass_job(job, feedback)
+
+    @callback
+    def async_stop(self) -> None:
+        """Remove all bus listeners."""
+        for unsubscribe in self._listeners.values():
+            unsubscribe()
+        self._listeners.clear()
+        self._subscribers.clear()
+
+
+@callback
+def async_subscribe_feedback(
+    entity: Entity,
+    device_id: list[int],
+    feedback_types: Iterable[str],
+    target: Callable[[Feedback], Any],
+    channel: int | None = None,
+) -> CALLBACK_TYPE:
+    """Subscribe an entity to feedback of its device until it is removed."""
+    dispatcher: FeedbackDispatcher = (
+        entity.platform.config_entry.runtime_data.dispatcher
+    )
+    unsubscribe = dispatcher.async_subscribe(device_id, feedback_types, target, channel)
+    entity.async_on_remove(unsubscribe)
+    return unsubscribe
@@ -6,6 +6,8 @@ from homeassistant.helpers.update_coordinator import (
     DataUpdateCoordinator,
 )
 
+from .state_writer import async_write_state
+
 
 class BaseSensorEntity(CoordinatorEntity):
     """Base class for all entities using the DataUpdateCoordinator."""
@@ -29,7 +31,7 @@ class BaseSensorEntity(CoordinatorEntity):
     def _handle_coordinator_update(self) -> None:
         """Handle updated data from the coordinator."""
         self._update_state(self.coordinator.data)
-        self.async_write_ha_state()
+        async_write_state(self)
 
     def _update_state(self, data):
         """Update the state based on the data."""
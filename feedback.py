@@ -0,0 +1,392 @@
+"""Typed records of TIS feedback events."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+import logging
+from math import ceil
+from typing import Any, ClassVar
+
+from homeassistant.core import Event
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, slots=True)
+class Feedback:
+    """A feedback event of a TIS device, parsed once per event.
+
+    payload is a read only view of the additional bytes of the packet,
+    slicing it does not copy. Feedback types without a record of their own
+    are delivered as this base record, their fields stay in event.data.
+    """
+
+    feedback_type: ClassVar[str | None] = None
+
+    event: Event = field(repr=False, compare=False)
+    device_id: tuple[int, ...]
+    payload: memoryview = field(repr=False)
+
+    @classmethod
+    def from_event(
+        cls, event: Event, device_id: tuple[int, ...], payload: memoryview
+    ) -> Feedback:
+        """Create the record of an event."""
+        return cls(event, device_id, payload)
+
+
+@dataclass(frozen=True, slots=True)
+class ControlResponse(Feedback):
+    """Level of a single channel after a control command."""
+
+    feedback_type: ClassVar[str] = "control_response"
+
+    channel: int
+    level: int
+
+    @classmethod
+    def from_event(cls, event, device_id, payload):
+        """Create the record of an event."""
+        return cls(event, device_id, payload, payload[0], payload[2])
+
+
+@dataclass(frozen=True, slots=True)
+class UpdateResponse(Feedback):
+    """Levels of every channel of a device, levels[c - 1] is channel c."""
+
+    feedback_type: ClassVar[str] = "update_response"
+
+    levels: memoryview
+
+    @classmethod
+    def from_event(cls, event, device_id, payload):
+        """Create the record of an event."""
+        return cls(event, device_id, payload, payload[1 : payload[0] + 1])
+
+
+@dataclass(frozen=True, slots=True)
+class BinaryFeedback(Feedback):
+    """On/off state of every channel of a device as a bitmask.
+
+    Bit n of bitmap holds the state of channel n + 1.
+    """
+
+    feedback_type: ClassVar[str] = "binary_feedback"
+
+    count: int
+    bitmap: int
+
+    @classmethod
+    def from_event(cls, event, device_id, payload):
+        """Create the record of an event."""
+        count = payload[0]
+        bitmap = int.from_bytes(payload[1 : ceil(count / 8) + 1], "little")
+        return cls(event, device_id, payload, count, bitmap)
+
+
+@dataclass(frozen=True, slots=True)
+class AutoBinaryFeedback(Feedback):
+    """State of every input channel of a device."""
+
+    feedback_type: ClassVar[str] = "auto_binary_feedback"
+
+    channels_values: tuple[int, ...]
+
+    @classmethod
+    def from_event(cls, event, device_id, payload):
+        """Create the record of an event."""
+        return cls(event, device_id, payload, tuple(event.data["channels_values"]))
+
+
+@dataclass(frozen=True, slots=True)
+class RealtimeFeedback(Feedback):
+    """Value of a single input channel."""
+
+    feedback_type: ClassVar[str] = "realtime_feedback"
+
+    channel: int
+    value: int
+
+    @classmethod
+    def from_event(cls, event, device_id, payload):
+        """Create the record of an event."""
+        return cls(event, device_id, payload, payload[0], payload[1])
+
+
+@dataclass(frozen=True, slots=True)
+class OfflineDevice(Feedback):
+    """A channel did not acknowledge a command."""
+
+    feedback_type: ClassVar[str] = "offline_device"
+
+    channel: int
+
+    @classmethod
+    def from_event(cls, event, device_id, payload):
+        """Create the record of an event."""
+        return cls(event, device_id, payload, int(event.data["channel_number"]))
+
+
+@dataclass(frozen=True, slots=True)
+class ACFeedback(Feedback):
+    """A single setting of an AC unit, channel is the AC number."""
+
+    feedback_type: ClassVar[str] = "ac_feedback"
+
+    channel: int
+    sub_operation: int
+    value: int
+
+    @classmethod
+    def from_event(cls, event, device_id, payload):
+        """Create the record of an event."""
+        data = event.data
+        return cls(
+            event,
+            device_id,
+            payload,
+            int(data["number"]),
+            data["sub_operation"],
+            data["operation_value"],
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class ACUpdate(Feedback):
+    """Every setting of an AC unit, channel is the AC number."""
+
+    feedback_type: ClassVar[str] = "update_feedback"
+
+    channel: int
+    state: int
+    hvac_mode: int
+    fan_speed: int
+    cool_temp: int
+    heat_temp: int
+    auto_temp: int
+
+    @classmethod
+    def from_event(cls, event, device_id, payload):
+        """Create the record of an event."""
+        data = event.data
+        return cls(
+            event,
+            device_id,
+            payload,
+            int(data["ac_number"]),
+            data["state"],
+            data["hvac_mode"],
+            data["fan_speed"],
+            data["cool_temp"],
+            data["heat_temp"],
+            data["auto_temp"],
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class FloorFeedback(Feedback):
+    """A single setting of a floor heater, channel is the heater number."""
+
+    feedback_type: ClassVar[str] = "floor_feedback"
+
+    channel: int
+    sub_operation: int
+    value: int
+
+    @classmethod
+    def from_event(cls, event, device_id, payload):
+        """Create the record of an event."""
+        data = event.data
+        return cls(
+            event,
+            device_id,
+            payload,
+            int(data["number"]),
+            data["sub_operation"],
+            data["operation_value"],
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class FloorUpdate(Feedback):
+    """Every setting of a floor heater, channel is the heater number."""
+
+    feedback_type: ClassVar[str] = "floor_update"
+
+    channel: int
+    state: int
+    temp: int
+
+    @classmethod
+    def from_event(cls, event, device_id, payload):
+        """Create the record of an event."""
+        data = event.data
+        return cls(
+            event,
+            device_id,
+            payload,
+            int(data["heater_number"]),
+            data["state"],
+            data["temp"],
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class SecurityFeedback(Feedback):
+    """Mode of a security module channel after a control command."""
+
+    feedback_type: ClassVar[str] = "security_feedback"
+
+    channel: int
+    mode: int
+
+    @classmethod
+    def from_event(cls, event, device_id, payload):
+        """Create the record of an event."""
+        return cls(event, device_id, payload, payload[0], payload[1])
+
+
+@dataclass(frozen=True, slots=True)
+class SecurityUpdate(SecurityFeedback):
+    """Mode of a security module channel."""
+
+    feedback_type: ClassVar[str] = "security_update"
+
+
+@dataclass(frozen=True, slots=True)
+class TempFeedback(Feedback):
+    """Temperature of a LUNA panel."""
+
+    feedback_type: ClassVar[str] = "temp_feedback"
+
+    temp: int
+
+    @classmethod
+    def from_event(cls, event, device_id, payload):
+        """Create the record of an event."""
+        return cls(event, device_id, payload, event.data["temp"])
+
+
+@dataclass(frozen=True, slots=True)
+class HealthFeedback(Feedback):
+    """Readings of a health sensor."""
+
+    feedback_type: ClassVar[str] = "health_feedback"
+
+    lux: int
+    noise: int
+    eco2: int
+    tvoc: int
+    co: int
+    temp: int
+
+    @classmethod
+    def from_event(cls, event, device_id, payload):
+        """Create the record of an event."""
+        data = event.data
+        return cls(
+            event,
+            device_id,
+            payload,
+            data["lux"],
+            data["noise"],
+            data["eco2"],
+            data["tvoc"],
+            data["co"],
+            data["temp"],
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class AnalogFeedback(Feedback):
+    """Values of every analog input, analog[c - 1] is channel c."""
+
+    feedback_type: ClassVar[str] = "analog_feedback"
+
+    analog: memoryview
+
+    @classmethod
+    def from_event(cls, event, device_id, payload):
+        """Create the record of an event."""
+        return cls(event, device_id, payload, payload[1 : payload[0] + 1])
+
+
+@dataclass(frozen=True, slots=True)
+class EnergyFeedback(Feedback):
+    """Live readings of an energy meter channel."""
+
+    feedback_type: ClassVar[str] = "energy_feedback"
+
+    channel: int
+    energy: dict[str, Any]
+
+    @classmethod
+    def from_event(cls, event, device_id, payload):
+        """Create the record of an event."""
+        data = event.data
+        return cls(event, device_id, payload, data["channel_num"], data["energy"])
+
+
+@dataclass(frozen=True, slots=True)
+class MonthlyEnergyFeedback(Feedback):
+    """Consumption of an energy meter channel this month."""
+
+    feedback_type: ClassVar[str] = "monthly_energy_feedback"
+
+    channel: int
+    energy: int
+
+    @classmethod
+    def from_event(cls, event, device_id, payload):
+        """Create the record of an event."""
+        data = event.data
+        return cls(event, device_id, payload, data["channel_num"], data["energy"])
+
+
+FEEDBACK_RECORDS: dict[str, type[Feedback]] = {
+    record.feedback_type: record
+    for record in (
+        ControlResponse,
+        UpdateResponse,
+        BinaryFeedback,
+        AutoBinaryFeedback,
+        RealtimeFeedback,
+        OfflineDevice,
+        ACFeedback,
+        ACUpdate,
+        FloorFeedback,
+        FloorUpdate,
+        SecurityFeedback,
+        SecurityUpdate,
+        TempFeedback,
+        HealthFeedback,
+        AnalogFeedback,
+        EnergyFeedback,
+        MonthlyEnergyFeedback,
+    )
+}
+
+# feedback types addressed to a single channel, their records have a channel
+CHANNEL_FEEDBACK_TYPES = frozenset(
+    feedback_type
+    for feedback_type, record in FEEDBACK_RECORDS.items()
+    if "channel" in record.__dataclass_fields__
+)
+
+
+def parse_feedback(event: Event) -> Feedback | None:
+    """Return the record of a feedback event, None if it is malformed."""
+    data = event.data
+    try:
+        additional_bytes = data.get("additional_bytes")
+        payload = memoryview(bytes(additional_bytes) if additional_bytes else b"")
+        record = FEEDBACK_RECORDS.get(data.get("feedback_type"), Feedback)
+        return record.from_event(event, tuple(data["device_id"]), payload)
+    except (KeyError, IndexError, ValueError, TypeError) as err:
+        _LOGGER.debug("Ignoring malformed feedback %s: %r", data, err)
+        return None
+
+
+def channel_is_on(bitmap: int, channel_number: int) -> bool:
+    """Return the state of a channel from a channel bitmask."""
+    return bool(bitmap >> (channel_number - 1) & 1)
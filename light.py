@@ -1,11 +1,10 @@
 """Light platform for TIS Control."""
 
+from collections.abc import Coroutine
 import logging
-from math import ceil
 from typing import Any
 
 from TISControlProtocol.api import TISApi
-from TISControlProtocol.BytesHelper import int_to_8_bit_binary
 from TISControlProtocol.Protocols.udp.ProtocolHandler import (
     TISPacket,
     TISProtocolHandler,
@@ -15,19 +14,67 @@ from homeassistant.components.light import (
     ATTR_BRIGHTNESS,
     ATTR_RGB_COLOR,
     ATTR_RGBW_COLOR,
+    ATTR_TRANSITION,
     ColorMode,
     LightEntity,
     LightEntityFeature,
 )
 from homeassistant.const import STATE_OFF, STATE_ON, STATE_UNKNOWN
-from homeassistant.core import Event, HomeAssistant, callback
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.exceptions import HomeAssistantError
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
 from . import TISConfigEntry
+from .channels import (
+    BROADCAST_CHANNEL,
+    ChannelStateStore,
+    all_channels_devices,
+    all_channels_name,
+)
+from .commands import (
+    CommandCoalescer,
+    async_run_command,
+    async_send_channel_levels,
+    async_software_transition,
+    light_control_packet,
+    ramp_time,
+    supports_ramp_time,
+)
+from .dispatcher import async_subscribe_feedback
+from .feedback import (
+    BinaryFeedback,
+    ControlResponse,
+    Feedback,
+    OfflineDevice,
+    UpdateResponse,
+)
+from .scheduler import async_request_state, async_request_update
+from .snapshot import RESTORED_ATTRIBUTES
+from .state_writer import async_schedule_write
 
 handler = TISProtocolHandler()
 
 
+def acked_color(
+    channels: tuple[int, ...],
+    color: tuple[int, ...],
+    previous: tuple[int, ...] | None,
+    acks: dict[int, bool],
+) -> tuple[int, ...]:
+    """Return the color the light shows, channels without an ack keep theirs."""
+    previous = previous or (0,) * len(color)
+    return tuple(
+        value if acks[channel] else old
+        for channel, value, old in zip(channels, color, previous, strict=True)
+    )
+
+
+def raise_for_acks(entity: LightEntity, acks: dict[int, bool]) -> None:
+    """Raise an error naming the channels that did not acknowledge."""
+    if failed := [channel for channel, ack in acks.items() if not ack]:
+        raise HomeAssistantError(f"no ack for {entity.entity_id}, channels: {failed}")
+
+
 async def async_setup_entry(
     hass: HomeAssistant,
     entry: TISConfigEntry,
@@ -35,7 +82,8 @@ async def async_setup_entry(
 ) -> None:
     """Set up TIS Control lights."""
     tis_api: TISApi = entry.runtime_data.api
-    lights: dict = await tis_api.get_entities(platform="dimmer")
+
+    lights: dict = entry.runtime_data.catalog.entities("dimmer")
     if lights:
         light_entities = [
             (
@@ -58,9 +106,23 @@ async def async_setup_entry(
             )
             for light_name, channel_number, device_id, is_protected, gateway in light_entities
         ]
+        # one light per dimmer setting all of its channels in a single frame
+        tis_lights.extend(
+            TISLight(
+                tis_api=tis_api,
+                light_name=all_channels_name(device_id),
+                device_id=list(device_id),
+                channel_number=BROADCAST_CHANNEL,
+                gateway=gateway,
+            )
+            for device_id, gateway in all_channels_devices(
+                (device_id, gateway, channel_number)
+                for _, channel_number, device_id, _, gateway in light_entities
+            ).items()
+        )
         async_add_devices(tis_lights)
 
-    rgb_lights: dict = await tis_api.get_entities(platform="rgb")
+    rgb_lights: dict = entry.runtime_data.catalog.entities("rgb")
     if rgb_lights:
         rgb_light_entities = [
             (
@@ -89,7 +151,7 @@ async def async_setup_entry(
         ]
         async_add_devices(tis_rgb_lights)
 
-    rgbw_lights: dict = await tis_api.get_entities(platform="rgbw")
+    rgbw_lights: dict = entry.runtime_data.catalog.entities("rgbw")
     if rgbw_lights:
         rgbw_light_entities = [
             (
@@ -141,8 +203,10 @@ class TISLight(LightEntity):
         self._attr_state = False
         self._attr_brightness = None
         self.listener = None
-        self.broadcast_channel = 255
+        self.channel_states: ChannelStateStore | None = None
+        self.broadcast_channel = BROADCAST_CHANNEL
         self._attr_unique_id = f"{self.name}_{self.channel_number}"
+        self.commands = CommandCoalescer(self)
 
         self.setup_light()
 
@@ -151,49 +215,89 @@ class TISLight(LightEntity):
         self._attr_supported_color_modes = {ColorMode.BRIGHTNESS}
         self._attr_color_mode = ColorMode.BRIGHTNESS
         self._attr_supported_features = LightEntityFeature.TRANSITION
-        self.generate_light_packet = handler.generate_light_control_packet
+        self.generate_light_packet = light_control_packet
         self.update_packet: TISPacket = handler.generate_control_update_packet(self)
 
     async def async_added_to_hass(self) -> None:
         """Run when entity about to be added to hass."""
 
+        broadcast = self.channel_number == self.broadcast_channel
+        feedback_handlers = (
+            self._BROADCAST_FEEDBACK_HANDLERS if broadcast else self._FEEDBACK_HANDLERS
+        )
+
+        def level() -> int | None:
+            if broadcast:
+                # on while any channel of the device is
+                return self.channel_states.max_level(self.device_id)
+            return self.channel_states.get(self.device_id, self.channel_number)
+
         @callback
-        async def handle_event(event: Event):
-            """Handle the event."""
-            # check if event is for this switch
-            if event.event_type == str(self.device_id):
-                if event.data["feedback_type"] == "control_response":
-                    logging.info(f"channel number for light: {self.channel_number}")
-                    channel_value = event.data["additional_bytes"][2]
-                    channel_number = event.data["channel_number"]
-                    if int(channel_number) == self.channel_number:
-                        self._attr_state = int(channel_value) != 0
-                        self._attr_brightness = int((channel_value / 100) * 255)
-                    self.async_write_ha_state()
-
-                elif self.channel_number != self.broadcast_channel:
-                    if event.data["feedback_type"] == "binary_feedback":
-                        n_bytes = ceil(event.data["additional_bytes"][0] / 8)
-                        channels_status = "".join(
-                            int_to_8_bit_binary(event.data["additional_bytes"][i])
-                            for i in range(1, n_bytes + 1)
-                        )
-                        if channels_status[self.channel_number - 1] == "0":
-                            self._attr_state = False
-                        self.async_write_ha_state()
-                    elif event.data["feedback_type"] == "update_response":
-                        additional_bytes = event.data["additional_bytes"]
-                        self._attr_brightness = int(
-                            additional_bytes[self.channel_number] / 100 * 255
-                        )
-                        self._attr_state = (
-                            STATE_ON if self._attr_brightness > 0 else STATE_OFF
-                        )
-                elif event.data["feedback_type"] == "offline_device":
-                    self._attr_state = STATE_UNKNOWN
-
-        self.listener = self.hass.bus.async_listen(str(self.device_id), handle_event)
-        _ = await self.api.protocol.sender.send_packet(self.update_packet)
+        def handle_event(feedback: Feedback):
+            """Handle the feedback."""
+            apply = feedback_handlers.get(type(feedback))
+            if apply is not None:
+                apply(self, level())
+                self._attr_extra_state_attributes = None
+                async_schedule_write(self)
+
+        self.channel_states = self.platform.config_entry.runtime_data.channel_states
+        self.channel_states.register(self.device_id, self.channel_number)
+        # start from the level saved by the last run until the device answers
+        if self.channel_states.is_restored(self.device_id):
+            self._apply_update_response(level())
+            self._attr_extra_state_attributes = RESTORED_ATTRIBUTES
+        feedback_types = ("control_response", "binary_feedback", "update_response")
+        if broadcast:
+            # any channel of the device going offline makes the light unknown
+            feedback_types += ("offline_device",)
+        self.listener = async_subscribe_feedback(
+            self,
+            self.device_id,
+            feedback_types,
+            handle_event,
+            # the broadcast channel follows the feedback of every channel
+            None if broadcast else self.channel_number,
+        )
+        self.platform.config_entry.async_create_background_task(
+            self.hass,
+            async_request_update(self, self.update_packet),
+            f"{self.entity_id} state",
+        )
+
+    def _apply_control_response(self, level: int | None) -> None:
+        """Apply the level reported after a control command."""
+        logging.info(f"channel number for light: {self.channel_number}")
+        self._attr_state = level != 0
+        self._attr_brightness = int((level / 100) * 255)
+
+    def _apply_binary_feedback(self, level: int | None) -> None:
+        """Apply an on/off report, it only carries the level when off."""
+        if level == 0:
+            self._attr_state = False
+            self._attr_brightness = 0
+
+    def _apply_update_response(self, level: int | None) -> None:
+        """Apply the level reported by a state update."""
+        if level is not None:
+            self._attr_brightness = int(level / 100 * 255)
+            self._attr_state = STATE_ON if self._attr_brightness > 0 else STATE_OFF
+
+    def _apply_offline_device(self, level: int | None) -> None:
+        """Mark the light unknown after an unacknowledged command."""
+        self._attr_state = STATE_UNKNOWN
+
+    _FEEDBACK_HANDLERS = {
+        ControlResponse: _apply_control_response,
+        BinaryFeedback: _apply_binary_feedback,
+        UpdateResponse: _apply_update_response,
+    }
+    _BROADCAST_FEEDBACK_HANDLERS = {
+        ControlResponse: _apply_update_response,
+        BinaryFeedback: _apply_update_response,
+        UpdateResponse: _apply_update_response,
+        OfflineDevice: _apply_offline_device,
+    }
 
     @property
     def brightness(self) -> int | None:
@@ -225,35 +329,47 @@ class TISLight(LightEntity):
         """Return the name of the light."""
         return self._attr_name
 
+    def _send_level(
+        self, level: int, transition: float | None
+    ) -> Coroutine[Any, Any, bool | None]:
+        """Return the command fading the channel to a level over a transition.
+
+        The device fades over the ramp time of the packet itself, unless
+        its model is known not to, then it gets a software fade.
+        """
+        if transition and not supports_ramp_time(self):
+            start = self.channel_states.get(self.device_id, self.channel_number)
+            return async_software_transition(
+                self, self.commands, start or 0, level, transition
+            )
+        packet = self.generate_light_packet(self, level, ramp_time(transition))
+        return self.commands.async_send_with_ack(packet)
+
     async def async_turn_on(self, **kwargs: Any) -> None:
         """Turn the light on."""
         try:
             brightness_level = kwargs[ATTR_BRIGHTNESS]
         except KeyError:
             brightness_level = 255
-        packet = self.generate_light_packet(self, int((brightness_level / 255) * 100))
-        ack_status = await self.api.protocol.sender.send_packet_with_ack(packet)
-        if ack_status:
-            self._attr_state = True
-            self._attr_brightness = kwargs.get(ATTR_BRIGHTNESS, 255)
-        else:
+        await async_run_command(
+            self,
+            self._send_level(
+                int((brightness_level / 255) * 100), kwargs.get(ATTR_TRANSITION)
+            ),
+            {"_attr_state": True, "_attr_brightness": brightness_level},
             # set light to unknown
-            self._attr_state = None
-            self._attr_brightness = None
-        self.async_write_ha_state()
+            {"_attr_state": None, "_attr_brightness": None},
+        )
 
     async def async_turn_off(self, **kwargs: Any) -> None:
         """Turn the light off."""
-        packet = self.generate_light_packet(self, 0)
-        ack_status = await self.api.protocol.sender.send_packet_with_ack(packet)
-        if ack_status:
-            self._attr_brightness = 0
-            self._attr_state = False
-        else:
+        await async_run_command(
+            self,
+            self._send_level(0, kwargs.get(ATTR_TRANSITION)),
+            {"_attr_state": False, "_attr_brightness": 0},
             # set light to unknown
-            self._attr_state = None
-            self._attr_brightness = None
-        self.async_write_ha_state()
+            {"_attr_state": None, "_attr_brightness": None},
+        )
 
 
 class TISRGBLight(LightEntity):
@@ -277,6 +393,7 @@ class TISRGBLight(LightEntity):
         self.g_channel = int(g_channel)
         self.b_channel = int(b_channel)
         self.rgb_value_flags = [0, 0, 0]
+        self.channel_states: ChannelStateStore | None = None
         # hass attrs
         self._attr_name = light_name
         self._attr_state = None
@@ -294,49 +411,51 @@ class TISRGBLight(LightEntity):
         """."""
         self._attr_supported_color_modes = {ColorMode.RGB}
         self._attr_color_mode = ColorMode.RGB
-        self.generate_rgb_packets = handler.generate_rgb_light_control_packet
+        self.color_channels = (self.r_channel, self.g_channel, self.b_channel)
         self.update_packet = handler.generate_control_update_packet(self)
 
     async def async_added_to_hass(self) -> None:
         """Run when entity about to be added to hass."""
 
         @callback
-        async def handle_event(event: Event):
-            """Handle the event."""
-            if event.event_type == str(self.device_id):
-                if event.data["feedback_type"] == "update_response":
-                    additional_bytes = event.data["additional_bytes"]
-                    channel_number = event.data["channel_number"]
-
-                    if self._attr_rgb_color is None:
-                        self._attr_rgb_color = [0, 0, 0]
-                    if channel_number == self.r_channel:
-                        self._attr_rgb_color[0] = int(
-                            (additional_bytes[channel_number] / 100) * 255
-                        )
-                    elif channel_number == self.g_channel:
-                        self._attr_rgb_color[1] = int(
-                            (additional_bytes[channel_number] / 100) * 255
-                        )
-                    elif channel_number == self.b_channel:
-                        self._attr_rgb_color[2] = int(
-                            (additional_bytes[channel_number] / 100) * 255
-                        )
-                    self._attr_state = bool(
-                        self.r_channel or self.g_channel or self.b_channel
-                    )
-                elif event.data["feedback_type"] == "offline_device":
-                    self._attr_state = STATE_UNKNOWN
+        def handle_event(feedback: Feedback):
+            """Handle the feedback."""
+            if isinstance(feedback, UpdateResponse):
+                levels = [
+                    self.channel_states.get(self.device_id, channel)
+                    for channel in self.color_channels
+                ]
+                if None not in levels:
+                    self._attr_rgb_color = [
+                        int((level / 100) * 255) for level in levels
+                    ]
+                self._attr_state = bool(
+                    self.r_channel or self.g_channel or self.b_channel
+                )
+            elif isinstance(feedback, OfflineDevice):
+                self._attr_state = STATE_UNKNOWN
 
-        self.listener = self.hass.bus.async_listen(str(self.device_id), handle_event)
-        # send update 5 times or until receiving a state
-        for _i in range(5):
-            if self._attr_rgb_color is None:
-                _ = await self.api.protocol.sender.send_packet(self.update_packet)
+            async_schedule_write(self)
 
-        if self._attr_rgb_color is None:
+        self.channel_states = self.platform.config_entry.runtime_data.channel_states
+        self.channel_states.register(self.device_id, *self.color_channels)
+        self.listener = async_subscribe_feedback(
+            self, self.device_id, ("update_response", "offline_device"), handle_event
+        )
+        # the device may take a few tries, the light is set up meanwhile
+        self.platform.config_entry.async_create_background_task(
+            self.hass, self._async_request_state(), f"{self.entity_id} state"
+        )
+
+    async def _async_request_state(self) -> None:
+        """Request the state of the device, unknown when it does not answer."""
+        if not await async_request_state(
+            self, self.update_packet, lambda: self._attr_rgb_color is not None
+        ):
+            logging.warning(f"no state from device {self.device_id} for {self.name}")
             self._attr_state = STATE_UNKNOWN
             self._attr_rgb_color = (0, 0, 0)
+            async_schedule_write(self)
 
     @property
     def color_mode(self) -> ColorMode | str | None:
@@ -371,6 +490,7 @@ class TISRGBLight(LightEntity):
 
     async def async_turn_on(self, **kwargs: Any) -> None:
         """Turn the light on."""
+        acks: dict[int, bool] = {}
         try:
             color = kwargs.get(ATTR_RGB_COLOR, None)
             brightness = kwargs.get(ATTR_BRIGHTNESS, None)
@@ -380,32 +500,17 @@ class TISRGBLight(LightEntity):
             if color is not None:
                 # map color from 255 to 100
                 color = tuple([int((c / 255) * 100) for c in color])
-                r_packet, g_packet, b_packet = self.generate_rgb_packets(self, color)
-                ack_status = await self.api.protocol.sender.send_packet_with_ack(
-                    r_packet
-                )
-                if not ack_status:
-                    logging.error(
-                        f"error turning on light: {ack_status}, channel: {self.r_channel}",
-                    )
-                ack_status = await self.api.protocol.sender.send_packet_with_ack(
-                    g_packet
-                )
-                if not ack_status:
-                    logging.error(
-                        f"error turning on light: {ack_status}, channel: {self.g_channel}",
-                    )
-                ack_status = await self.api.protocol.sender.send_packet_with_ack(
-                    b_packet
+                # one packet per channel unless every level is the same
+                acks = await async_send_channel_levels(
+                    self, dict(zip(self.color_channels, color))
                 )
-                if not ack_status:
-                    logging.error(
-                        f"error turning on light: {ack_status}, channel: {self.b_channel}",
-                    )
-                self._attr_state = True
                 # map color from 100 to 255
                 color = tuple([int((c / 100) * 255) for c in color])
-                self._attr_rgb_color = color
+                self._attr_rgb_color = acked_color(
+                    self.color_channels, color, self._attr_rgb_color, acks
+                )
+                if any(acks.values()):
+                    self._attr_state = True
                 self.default_color = color
                 logging.info(f"new default color: {color}")
             elif brightness is not None:
@@ -416,80 +521,44 @@ class TISRGBLight(LightEntity):
                 logging.info(f"default color: {color}")
                 color = tuple([int(brightness * c * 100 / 255) for c in color])
 
-                r_packet, g_packet, b_packet = self.generate_rgb_packets(self, color)
-                ack_status = await self.api.protocol.sender.send_packet_with_ack(
-                    r_packet
+                acks = await async_send_channel_levels(
+                    self, dict(zip(self.color_channels, color))
                 )
-                if not ack_status:
-                    logging.error(
-                        f"error turning on light: {ack_status}, channel: {self.r_channel}",
-                    )
-                ack_status = await self.api.protocol.sender.send_packet_with_ack(
-                    g_packet
-                )
-                if not ack_status:
-                    logging.error(
-                        f"error turning on light: {ack_status}, channel: {self.g_channel}",
-                    )
-                ack_status = await self.api.protocol.sender.send_packet_with_ack(
-                    b_packet
-                )
-                if not ack_status:
-                    logging.error(
-                        f"error turning on light: {ack_status}, channel: {self.b_channel}",
-                    )
                 logging.info(f"brightened color: {color}")
             else:
                 logging.info(
                     "Neither color nor brightness provided, using default color."
                 )
                 color = self.default_color or (0, 0, 0)
-                self._attr_state = (
-                    True
-                    if self.default_color and self.default_color != (0, 0, 0)
-                    else False
+                acks = await async_send_channel_levels(
+                    self,
+                    dict(zip(self.color_channels, [int(c * 100 / 255) for c in color])),
                 )
-                self._attr_rgb_color = color
-                color = tuple([int(c * 100 / 255) for c in color])
-                r_packet, g_packet, b_packet = self.generate_rgb_packets(self, color)
-                ack_status = await self.api.protocol.sender.send_packet_with_ack(
-                    r_packet
+                self._attr_rgb_color = acked_color(
+                    self.color_channels, color, self._attr_rgb_color, acks
                 )
-                if not ack_status:
-                    logging.error(
-                        f"error turning on light: {ack_status}, channel: {self.r_channel}",
-                    )
-                ack_status = await self.api.protocol.sender.send_packet_with_ack(
-                    g_packet
-                )
-                if not ack_status:
-                    logging.error(
-                        f"error turning on light: {ack_status}, channel: {self.g_channel}",
-                    )
-                ack_status = await self.api.protocol.sender.send_packet_with_ack(
-                    b_packet
-                )
-                if not ack_status:
-                    logging.error(
-                        f"error turning on light: {ack_status}, channel: {self.b_channel}",
-                    )
+                self._attr_state = any(self._attr_rgb_color)
 
         except KeyError as e:
             logging.error(f"error turning on light: {e}")
         self.async_write_ha_state()
         # self.schedule_update_ha_state()
+        raise_for_acks(self, acks)
 
     async def async_turn_off(self, **kwargs: Any) -> None:
         """Turn the light off."""
         logging.info("turning off")
         logging.info(f"kwargs: {kwargs}")
-        r_packet, g_packet, b_packet = self.generate_rgb_packets(self, (0, 0, 0))
-        _ = await self.api.protocol.sender.send_packet_with_ack(g_packet)
-        _ = await self.api.protocol.sender.send_packet_with_ack(r_packet)
-        _ = await self.api.protocol.sender.send_packet_with_ack(b_packet)
-        self._attr_state = False
-        self._attr_rgb_color = (0, 0, 0)
+        # a single broadcast frame when the light owns every channel of its model
+        acks = await async_send_channel_levels(
+            self, dict(zip(self.color_channels, (0, 0, 0)))
+        )
+        self._attr_rgb_color = acked_color(
+            self.color_channels, (0, 0, 0), self._attr_rgb_color, acks
+        )
+        self._attr_state = any(self._attr_rgb_color)
         self.async_write_ha_state()
+        raise_for_acks(self, acks)
 
 
 class TISRGBWLight(LightEntity):
@@ -520,6 +589,7 @@ class TISRGBWLight(LightEntity):
         self._attr_brightness = None
         self._attr_rgbw_color = None
         self.rgbw_value_flags = [0, 0, 0, 0]
+        self.channel_states: ChannelStateStore | None = None
         self.listener = None
         self._attr_unique_id = f"{self.name}_{self.r_channel}_{self.g_channel}_{self.b_channel}_{self.w_channel}"
         self.default_color = (0, 0, 0, 0)
@@ -530,40 +600,55 @@ class TISRGBWLight(LightEntity):
         self._attr_supported_color_modes = {ColorMode.RGBW}
         self._attr_color_mode = ColorMode.RGBW
         self._attr_supported_features = LightEntityFeature.TRANSITION
-        self.generate_rgbw_packets = handler.generate_rgbw_light_control_packet
+        self.color_channels = (
+            self.r_channel,
+            self.g_channel,
+            self.b_channel,
+            self.w_channel,
+        )
         self.update_packet = handler.generate_control_update_packet(self)
 
     async def async_added_to_hass(self) -> None:
         """Run when entity about to be added to hass."""
 
         @callback
-        async def handle_event(event: Event):
-            """Handle the event."""
-            # check if event is for this switch
-            if event.event_type == str(self.device_id):
-                if event.data["feedback_type"] == "update_response":
-                    logging.info(f"RGBW event data: {event.data}")
-                    additional_bytes = event.data["additional_bytes"]
-
-                    r_value = (additional_bytes[self.r_channel] / 100) * 255
-                    g_value = (additional_bytes[self.g_channel] / 100) * 255
-                    b_value = (additional_bytes[self.b_channel] / 100) * 255
-                    w_value = (additional_bytes[self.w_channel] / 100) * 255
-
-                    self._attr_rgbw_color = (r_value, g_value, b_value, w_value)
-                    self._attr_state = bool(r_value or g_value or b_value or w_value)
-                elif event.data["feedback_type"] == "offline_device":
-                    self._attr_state = STATE_UNKNOWN
-
-        self.listener = self.hass.bus.async_listen(str(self.device_id), handle_event)
-        # send update 5 times or until receiving a state
-        for _i in range(5):
-            if self._attr_rgbw_color is None:
-                _ = await self.api.protocol.sender.send_packet(self.update_packet)
-
-        if self._attr_rgbw_color is None:
+        def handle_event(feedback: Feedback):
+            """Handle the feedback."""
+            if isinstance(feedback, UpdateResponse):
+                logging.info(f"RGBW feedback: {feedback}")
+                levels = [
+                    self.channel_states.get(self.device_id, channel)
+                    for channel in self.color_channels
+                ]
+                if None not in levels:
+                    self._attr_rgbw_color = tuple(
+                        (level / 100) * 255 for level in levels
+                    )
+                    self._attr_state = any(levels)
+            elif isinstance(feedback, OfflineDevice):
+                self._attr_state = STATE_UNKNOWN
+
+            async_schedule_write(self)
+
+        self.channel_states = self.platform.config_entry.runtime_data.channel_states
+        self.channel_states.register(self.device_id, *self.color_channels)
+        self.listener = async_subscribe_feedback(
+            self, self.device_id, ("update_response", "offline_device"), handle_event
+        )
+        # the device may take a few tries, the light is set up meanwhile
+        self.platform.config_entry.async_create_background_task(
+            self.hass, self._async_request_state(), f"{self.entity_id} state"
+        )
+
+    async def _async_request_state(self) -> None:
+        """Request the state of the device, unknown when it does not answer."""
+        if not await async_request_state(
+            self, self.update_packet, lambda: self._attr_rgbw_color is not None
+        ):
+            logging.warning(f"no state from device {self.device_id} for {self.name}")
             self._attr_state = STATE_UNKNOWN
             self._attr_rgbw_color = (0, 0, 0, 0)
+            async_schedule_write(self)
 
     @property
     def brightness(self) -> int | None:
@@ -588,7 +673,9 @@ class TISRGBWLight(LightEntity):
 
     @property
     def supported_features(self) -> LightEntityFeature:
-        """Flag supported features."""
+        """Flag supported features, no transition on models that cannot fade."""
+        if self.channel_states is not None and not supports_ramp_time(self):
+            return LightEntityFeature(0)
         return self._attr_supported_features
 
     @property
@@ -601,8 +688,13 @@ class TISRGBWLight(LightEntity):
         """Return the name of the light."""
         return self._attr_name
 
+    def _ramp_time(self, kwargs: dict[str, Any]) -> int:
+        """Return the ramp time of a transition."""
+        return ramp_time(kwargs.get(ATTR_TRANSITION))
+
     async def async_turn_on(self, **kwargs: Any) -> None:
         """Turn the light on."""
+        acks: dict[int, bool] = {}
         try:
             color = kwargs.get(ATTR_RGBW_COLOR, None)
             brightness = kwargs.get(ATTR_BRIGHTNESS, None)
@@ -610,43 +702,19 @@ class TISRGBWLight(LightEntity):
             if color is not None:
                 # map color from 255 to 100
                 color = tuple([int((c / 255) * 100) for c in color])
-                r_packet, g_packet, b_packet, w_packet = self.generate_rgbw_packets(
-                    self, color
-                )
                 logging.info(f"color (percent): {color}")
-                ack_status = await self.api.protocol.sender.send_packet_with_ack(
-                    r_packet
-                )
-                if not ack_status:
-                    logging.error(
-                        f"error turning on light: {ack_status}, channel: {self.r_channel}",
-                    )
-                ack_status = await self.api.protocol.sender.send_packet_with_ack(
-                    g_packet
-                )
-                if not ack_status:
-                    logging.error(
-                        f"error turning on light: {ack_status}, channel: {self.g_channel}",
-                    )
-                ack_status = await self.api.protocol.sender.send_packet_with_ack(
-                    b_packet
+                # one packet per channel unless every level is the same
+                acks = await async_send_channel_levels(
+                    self, dict(zip(self.color_channels, color)), self._ramp_time(kwargs)
                 )
-                if not ack_status:
-                    logging.error(
-                        f"error turning on light: {ack_status}, channel: {self.b_channel}",
-                    )
-                ack_status = await self.api.protocol.sender.send_packet_with_ack(
-                    w_packet
-                )
-                if not ack_status:
-                    logging.error(
-                        f"error turning on light: {ack_status}, channel: {self.w_channel}",
-                    )
 
-                self._attr_state = True
                 # map color from 100 to 255
                 color = tuple([int((c / 100) * 255) for c in color])
-                self._attr_rgbw_color = color
+                self._attr_rgbw_color = acked_color(
+                    self.color_channels, color, self._attr_rgbw_color, acks
+                )
+                if any(acks.values()):
+                    self._attr_state = True
                 self.default_color = color
             elif brightness is not None:
                 brightness = max(1, min(255, brightness))
@@ -660,56 +728,34 @@ class TISRGBWLight(LightEntity):
                 logging.info(f"default color: {color}")
                 color = tuple([int(brightness * c * 100 / 255) for c in color])
 
-                r_packet, g_packet, b_packet, w_packet = self.generate_rgbw_packets(
-                    self, color
-                )
-                ack_status = await self.api.protocol.sender.send_packet_with_ack(
-                    r_packet
+                acks = await async_send_channel_levels(
+                    self, dict(zip(self.color_channels, color)), self._ramp_time(kwargs)
                 )
-                if not ack_status:
-                    logging.error(
-                        f"error turning on light: {ack_status}, channel: {self.r_channel}",
-                    )
-                ack_status = await self.api.protocol.sender.send_packet_with_ack(
-                    g_packet
-                )
-                if not ack_status:
-                    logging.error(
-                        f"error turning on light: {ack_status}, channel: {self.g_channel}",
-                    )
-                ack_status = await self.api.protocol.sender.send_packet_with_ack(
-                    b_packet
-                )
-                if not ack_status:
-                    logging.error(
-                        f"error turning on light: {ack_status}, channel: {self.b_channel}",
-                    )
-                ack_status = await self.api.protocol.sender.send_packet_with_ack(
-                    w_packet
-                )
-                if not ack_status:
-                    logging.error(
-                        f"error turning on light: {ack_status}, channel: {self.w_channel}",
-                    )
-                self._attr_state = True
+                if any(acks.values()):
+                    self._attr_state = True
                 # map color from 100 to 255
                 color = tuple([int((c / 100) * 255) for c in color])
-                self._attr_rgbw_color = color
+                self._attr_rgbw_color = acked_color(
+                    self.color_channels, color, self._attr_rgbw_color, acks
+                )
 
         except KeyError as e:
             logging.error(f"error turning on light: {e}")
         self.async_write_ha_state()
         # self.schedule_update_ha_state()
+        raise_for_acks(self, acks)
 
     async def async_turn_off(self, **kwargs: Any) -> None:
         """Turn the light off."""
-        r_packet, g_packet, b_packet, w_packet = self.generate_rgbw_packets(
-            self, (0, 0, 0, 0)
+        # a single broadcast frame when the light owns every channel of its model
+        acks = await async_send_channel_levels(
+            self,
+            dict(zip(self.color_channels, (0, 0, 0, 0))),
+            self._ramp_time(kwargs),
         )
-        _ = await self.api.protocol.sender.send_packet_with_ack(r_packet)
-        _ = await self.api.protocol.sender.send_packet_with_ack(g_packet)
-        _ = await self.api.protocol.sender.send_packet_with_ack(b_packet)
-        _ = await self.api.protocol.sender.send_packet_with_ack(w_packet)
-        self._attr_state = False
-        self._attr_rgbw_color = (0, 0, 0, 0)
+        self._attr_rgbw_color = acked_color(
+            self.color_channels, (0, 0, 0, 0), self._attr_rgbw_color, acks
+        )
+        self._attr_state = any(self._attr_rgbw_color)
         self.async_write_ha_state()
+        raise_for_acks(self, acks)
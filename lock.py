@@ -1,16 +1,14 @@
 from homeassistant.components.lock import LockEntity
 from homeassistant.core import HomeAssistant
 from .const import DOMAIN
-from TISControlProtocol.api import TISApi
 import asyncio
 import logging
 
 
 async def async_setup_entry(hass: HomeAssistant, entry, async_add_devices):
-    tis_api: TISApi = entry.runtime_data.api
-    lock_module = await tis_api.get_entities(platform="lock_module")
+    lock_module = entry.runtime_data.catalog.entities("lock_module")
 
-    if lock_module is None:
+    if not lock_module:
         logging.error("No lock module found in the configuration")
         return
     else:
@@ -0,0 +1,113 @@
+"""Per device ack round trip times and the ack timeouts derived from them."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from math import ceil
+from typing import Any
+
+# smoothing of the round trip time and its variation, as TCP does
+RTT_ALPHA = 1 / 8
+RTT_BETA = 1 / 4
+MIN_ACK_TIMEOUT = 0.05
+MAX_ACK_TIMEOUT = 2.0
+MIN_ACK_ATTEMPTS = 3
+MAX_ACK_ATTEMPTS = 10
+# how long all attempts of a packet may take together, in seconds
+ACK_BUDGET = 2.5
+# used until a device answered once, the defaults of send_packet_with_ack
+DEFAULT_ACK_TIMEOUT = 1.0
+DEFAULT_ACK_ATTEMPTS = 15
+
+
+@dataclass(slots=True)
+class DeviceRoundTrip:
+    """Smoothed ack round trip time of a device."""
+
+    srtt: float | None = None
+    rttvar: float = 0.0
+    samples: int = 0
+    acks: int = 0
+    failures: int = 0
+
+    def add_sample(self, rtt: float) -> None:
+        """Add the round trip time of an ack to the averages."""
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        else:
+            self.rttvar += RTT_BETA * (abs(self.srtt - rtt) - self.rttvar)
+            self.srtt += RTT_ALPHA * (rtt - self.srtt)
+        self.samples += 1
+
+    @property
+    def timeout(self) -> float:
+        """Return how long to wait for the ack of one attempt."""
+        if self.srtt is None:
+            return DEFAULT_ACK_TIMEOUT
+        return min(MAX_ACK_TIMEOUT, max(MIN_ACK_TIMEOUT, self.srtt + 4 * self.rttvar))
+
+    @property
+    def attempts(self) -> int:
+        """Return how often to send a packet before giving up."""
+        if self.srtt is None:
+            return DEFAULT_ACK_ATTEMPTS
+        return min(
+            MAX_ACK_ATTEMPTS, max(MIN_ACK_ATTEMPTS, ceil(ACK_BUDGET / self.timeout))
+        )
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the learned values."""
+        return {
+            "srtt": self.srtt,
+            "rttvar": self.rttvar,
+            "timeout": self.timeout,
+            "attempts": self.attempts,
+            "samples": self.samples,
+            "acks": self.acks,
+            "failures": self.failures,
+        }
+
+
+class RoundTripTimes:
+    """Ack round trip times of every device.
+
+    Fast devices get short timeouts so a missing ack is noticed early,
+    devices on a congested bus segment get longer ones and fewer resends
+    instead of being marked unknown while their ack is on its way.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the registry."""
+        self._devices: dict[tuple[int, ...], DeviceRoundTrip] = {}
+
+    def device(self, device_id: list[int] | tuple[int, ...]) -> DeviceRoundTrip:
+        """Return the round trip times of a device."""
+        device = tuple(device_id)
+        round_trip = self._devices.get(device)
+        if round_trip is None:
+            round_trip = self._devices[device] = DeviceRoundTrip()
+        return round_trip
+
+    @staticmethod
+    def record(round_trip: DeviceRoundTrip, ack: bool | None, elapsed: float) -> None:
+        """Record the outcome of a packet, elapsed is counted from its first send.
+
+        After a resend there is no telling which attempt was answered, the
+        time since the first send can only overestimate the round trip. That
+        lengthens the timeout until the next ack of a first attempt brings
+        it back down. None means the sender dropped the packet for a newer
+        one, that says nothing about the device.
+        """
+        if ack:
+            round_trip.acks += 1
+            round_trip.add_sample(elapsed)
+        elif ack is not None:
+            round_trip.failures += 1
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the learned values of every device."""
+        return {
+            str(list(device)): round_trip.as_dict()
+            for device, round_trip in self._devices.items()
+        }
@@ -0,0 +1,374 @@
+"""Prioritized sending of TIS packets, one queue per gateway."""
+
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from collections.abc import Callable
+from typing import Any
+
+from TISControlProtocol.api import TISApi
+from TISControlProtocol.Protocols.udp.ProtocolHandler import (
+    TISPacket,
+    TISProtocolHandler,
+)
+
+from homeassistant.core import CALLBACK_TYPE, Event, HomeAssistant, callback
+from homeassistant.helpers.entity import Entity
+
+from .round_trip import RoundTripTimes
+
+# lanes, a lower number is sent first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_AUTOMATION = 1
+PRIORITY_POLLING = 2
+PRIORITY_INITIAL_SYNC = 3
+PRIORITY_NAMES = ("interactive", "automation", "polling", "initial_sync")
+# requests for the state of a device that does not answer
+STATE_REQUEST_ATTEMPTS = 5
+STATE_REQUEST_BACKOFF = 0.5  # seconds before the first retry, doubled each retry
+# feedback type of the reply to an update request, by operation code
+UPDATE_REPLY_TYPES = {
+    tuple(TISProtocolHandler.OPERATION_CONTROL_UPDATE): "update_response",
+    tuple(TISProtocolHandler.OPERATION_AC_UPDATE): "update_feedback",
+    tuple(TISProtocolHandler.OPERATION_FLOOR_UPDATE): "floor_update",
+    tuple(TISProtocolHandler.OPERATION_SECURITY_UPDATE): "security_update",
+}
+
+
+class GatewayQueue:
+    """Frames waiting for a slot on the bus behind one gateway.
+
+    A frame is granted a slot when no frame of a higher priority is waiting
+    and, with a frame rate cap, once the previous slot has passed.
+    """
+
+    def __init__(self, hass: HomeAssistant, max_frame_rate: float) -> None:
+        """Initialize the queue, max_frame_rate is frames per second."""
+        self.hass = hass
+        self.max_frame_rate = max_frame_rate
+        self._lanes: tuple[deque[tuple[asyncio.Future[None], float]], ...] = tuple(
+            deque() for _ in PRIORITY_NAMES
+        )
+        self._next_slot = 0.0
+        self._release_handle: asyncio.TimerHandle | None = None
+        self.sent = [0] * len(PRIORITY_NAMES)
+        self.max_depth = [0] * len(PRIORITY_NAMES)
+        self.total_wait = [0.0] * len(PRIORITY_NAMES)
+        self.max_wait = [0.0] * len(PRIORITY_NAMES)
+
+    @property
+    def interval(self) -> float:
+        """Return the time between two slots in seconds."""
+        return 1 / self.max_frame_rate if self.max_frame_rate > 0 else 0
+
+    async def async_acquire(self, priority: int) -> None:
+        """Wait until a frame of the given priority may be sent."""
+        now = self.hass.loop.time()
+        if self._release_handle is None and now >= self._next_slot:
+            # nothing is waiting, take the slot right away
+            self._grant(priority, now, now)
+            return
+        future = self.hass.loop.create_future()
+        lane = self._lanes[priority]
+        lane.append((future, now))
+        self.max_depth[priority] = max(self.max_depth[priority], len(lane))
+        self._async_schedule_release()
+        await future
+
+    def _grant(self, priority: int, enqueued_at: float, now: float) -> None:
+        wait = now - enqueued_at
+        self.sent[priority] += 1
+        self.total_wait[priority] += wait
+        self.max_wait[priority] = max(self.max_wait[priority], wait)
+        self._next_slot = now + self.interval
+
+    @callback
+    def _async_schedule_release(self) -> None:
+        if self._release_handle is None:
+            self._release_handle = self.hass.loop.call_at(
+                self._next_slot, self._async_release
+            )
+
+    @callback
+    def _async_release(self) -> None:
+        """Grant the next slot to the oldest frame of the highest priority."""
+        self._release_handle = None
+        now = self.hass.loop.time()
+        for priority, lane in enumerate(self._lanes):
+            while lane:
+                future, enqueued_at = lane.popleft()
+                if future.done():
+                    # the sender was cancelled while waiting
+                    continue
+                future.set_result(None)
+                self._grant(priority, enqueued_at, now)
+                if self.interval == 0:
+                    continue
+                if self.depth:
+                    self._async_schedule_release()
+                return
+
+    @property
+    def depth(self) -> int:
+        """Return the number of waiting frames."""
+        return sum(len(lane) for lane in self._lanes)
+
+    @callback
+    def async_stop(self) -> None:
+        """Cancel every waiting frame."""
+        if self._release_handle is not None:
+            self._release_handle.cancel()
+            self._release_handle = None
+        for lane in self._lanes:
+            while lane:
+                lane.popleft()[0].cancel()
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the queue metrics."""
+        return {
+            name: {
+                "depth": len(self._lanes[priority]),
+                "max_depth": self.max_depth[priority],
+                "sent": self.sent[priority],
+                "average_wait": (
+                    self.total_wait[priority] / self.sent[priority]
+                    if self.sent[priority]
+                    else 0
+                ),
+                "max_wait": self.max_wait[priority],
+            }
+            for priority, name in enumerate(PRIORITY_NAMES)
+        }
+
+
+class SendScheduler:
+    """Send packets through per gateway queues with priority lanes.
+
+    User commands are sent before automations, polling and the update
+    requests of entities being set up, and the frame rate towards each
+    gateway can be capped for the RS-485 bus behind it.
+    """
+
+    def __init__(
+        self, hass: HomeAssistant, api: TISApi, max_frame_rate: float = 0
+    ) -> None:
+        """Initialize the scheduler."""
+        self.hass = hass
+        self.api = api
+        self._max_frame_rate = max_frame_rate
+        self._queues: dict[str, GatewayQueue] = {}
+        self.round_trip_times = RoundTripTimes()
+        # reply of each pending request, with the removers of its listener
+        # and timeout
+        self._update_requests: dict[
+            tuple, tuple[asyncio.Future[bool], list[CALLBACK_TYPE]]
+        ] = {}
+        self.update_requests_sent = 0
+        self.update_requests_shared = 0
+        self.retried_devices: set[tuple[int, ...]] = set()
+        self.unanswered_devices: set[tuple[int, ...]] = set()
+
+    @property
+    def max_frame_rate(self) -> float:
+        """Return the frame rate cap per gateway, 0 is uncapped."""
+        return self._max_frame_rate
+
+    @max_frame_rate.setter
+    def max_frame_rate(self, max_frame_rate: float) -> None:
+        self._max_frame_rate = max_frame_rate
+        for queue in self._queues.values():
+            queue.max_frame_rate = max_frame_rate
+
+    def queue(self, gateway: str) -> GatewayQueue:
+        """Return the queue of a gateway."""
+        queue = self._queues.get(gateway)
+        if queue is None:
+            queue = self._queues[gateway] = GatewayQueue(
+                self.hass, self._max_frame_rate
+            )
+        return queue
+
+    async def async_send(self, packet: TISPacket, priority: int) -> None:
+        """Send a packet once its slot comes."""
+        await self.queue(packet.destination_ip).async_acquire(priority)
+        await self.api.protocol.sender.send_packet(packet)
+
+    async def async_send_with_ack(
+        self, packet: TISPacket, priority: int, **kwargs: Any
+    ) -> bool | None:
+        """Send a packet once its slot comes and wait for its ack.
+
+        Only the first attempt waits for a slot, retries are sent by the
+        sender as before. Unless given, the ack timeout and the number of
+        attempts follow the round trip times of the device.
+        """
+        await self.queue(packet.destination_ip).async_acquire(priority)
+        round_trip = self.round_trip_times.device(packet.device_id)
+        kwargs.setdefault("timeout", round_trip.timeout)
+        kwargs.setdefault("attempts", round_trip.attempts)
+        started = self.hass.loop.time()
+        ack = await self.api.protocol.sender.send_packet_with_ack(packet, **kwargs)
+        self.round_trip_times.record(round_trip, ack, self.hass.loop.time() - started)
+        return ack
+
+    async def async_send_update_request(
+        self, packet: TISPacket, priority: int
+    ) -> asyncio.Future[bool]:
+        """Send a request for the state of a device, once for all its entities.
+
+        Every entity of a device asks for its state when it is added while a
+        single reply answers all of them. A request equal to one that is
+        queued or still waiting for its reply is not sent again, the entity
+        is already subscribed to that reply. Returns a future resolving to
+        whether the device answered within its ack timeout. Only the reply
+        to the request counts as an answer, for requests missing from
+        UPDATE_REPLY_TYPES any feedback of the device does.
+        """
+        key = (
+            packet.destination_ip,
+            tuple(packet.device_id),
+            tuple(packet.operation_code),
+            tuple(packet.additional_bytes),
+        )
+        if (pending := self._update_requests.get(key)) is not None:
+            self.update_requests_shared += 1
+            return pending[0]
+        future: asyncio.Future[bool] = self.hass.loop.create_future()
+        removers: list[CALLBACK_TYPE] = []
+        self._update_requests[key] = (future, removers)
+        reply_type = UPDATE_REPLY_TYPES.get(tuple(packet.operation_code))
+
+        @callback
+        def async_release(event: Event | None = None) -> None:
+            """Let the next request go out once the device answered."""
+            if (
+                event is not None
+                and reply_type is not None
+                and event.data.get("feedback_type") != reply_type
+            ):
+                # other feedback of the device, not the reply
+                return
+            if self._update_requests.get(key, (None,))[0] is future:
+                del self._update_requests[key]
+            for remove in removers:
+                remove()
+            removers.clear()
+            if not future.done():
+                future.set_result(event is not None)
+
+        try:
+            await self.async_send(packet, priority)
+        except BaseException:
+            async_release()
+            raise
+        self.update_requests_sent += 1
+        removers.append(
+            self.hass.bus.async_listen(str(list(packet.device_id)), async_release)
+        )
+        # without a reply a later entity asks again
+        timeout = self.round_trip_times.device(packet.device_id).timeout
+        removers.append(self.hass.loop.call_later(timeout, async_release).cancel)
+        return future
+
+    async def async_request_state(
+        self, packet: TISPacket, priority: int, received: Callable[[], bool]
+    ) -> bool:
+        """Request the state of a device until received returns True.
+
+        Each request waits for the reply up to the ack timeout of the device,
+        retries back off exponentially. Returns whether the state arrived.
+        """
+        device = tuple(packet.device_id)
+        for attempt in range(STATE_REQUEST_ATTEMPTS):
+            if attempt:
+                self.retried_devices.add(device)
+                await asyncio.sleep(STATE_REQUEST_BACKOFF * 2 ** (attempt - 1))
+            await (await self.async_send_update_request(packet, priority))
+            if received():
+                self.unanswered_devices.discard(device)
+                return True
+        self.unanswered_devices.add(device)
+        return False
+
+    @callback
+    def async_stop(self) -> None:
+        """Cancel every waiting frame."""
+        for queue in self._queues.values():
+            queue.async_stop()
+        for future, removers in list(self._update_requests.values()):
+            for remove in removers:
+                remove()
+            future.cancel()
+        self._update_requests.clear()
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the queue metrics of every gateway."""
+        return {
+            "max_frame_rate": self._max_frame_rate,
+            "update_requests": {
+                "sent": self.update_requests_sent,
+                "shared": self.update_requests_shared,
+                "retried_devices": len(self.retried_devices),
+                "unanswered_devices": len(self.unanswered_devices),
+            },
+            "gateways": {
+                gateway: queue.as_dict() for gateway, queue in self._queues.items()
+            },
+        }
+
+
+def command_priority(entity: Entity) -> int:
+    """Return the lane of a command, interactive when a user issued it."""
+    context = entity._context
+    if context is not None and context.user_id is not None:
+        return PRIORITY_INTERACTIVE
+    return PRIORITY_AUTOMATION
+
+
+async def async_send(
+    entity: Entity, packet: TISPacket, priority: int = PRIORITY_INITIAL_SYNC
+) -> None:
+    """Send a packet of an entity through the scheduler."""
+    send_scheduler: SendScheduler = (
+        entity.platform.config_entry.runtime_data.send_scheduler
+    )
+    await send_scheduler.async_send(packet, priority)
+
+
+async def async_send_with_ack(
+    entity: Entity, packet: TISPacket, priority: int | None = None, **kwargs: Any
+) -> bool | None:
+    """Send a command packet of an entity through the scheduler.
+
+    Without a priority the lane follows who issued the command.
+    """
+    send_scheduler: SendScheduler = (
+        entity.platform.config_entry.runtime_data.send_scheduler
+    )
+    if priority is None:
+        priority = command_priority(entity)
+    return await send_scheduler.async_send_with_ack(packet, priority, **kwargs)
+
+
+async def async_request_update(
+    entity: Entity, packet: TISPacket, priority: int = PRIORITY_INITIAL_SYNC
+) -> None:
+    """Ask for the state of an entity's device, shared with its other entities."""
+    send_scheduler: SendScheduler = (
+        entity.platform.config_entry.runtime_data.send_scheduler
+    )
+    await send_scheduler.async_send_update_request(packet, priority)
+
+
+async def async_request_state(
+    entity: Entity,
+    packet: TISPacket,
+    received: Callable[[], bool],
+    priority: int = PRIORITY_INITIAL_SYNC,
+) -> bool:
+    """Request the state of an entity's device until received returns True."""
+    send_scheduler: SendScheduler = (
+        entity.platform.config_entry.runtime_data.send_scheduler
+    )
+    return await send_scheduler.async_request_state(packet, priority, received)
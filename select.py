@@ -1,7 +1,7 @@
 from homeassistant.components.select import SelectEntity
 from TISControlProtocol.api import TISApi
 
-from homeassistant.const import MATCH_ALL, STATE_UNAVAILABLE
+from homeassistant.const import STATE_UNAVAILABLE
 from homeassistant.core import callback, Event, HomeAssistant
 from TISControlProtocol.Protocols.udp.ProtocolHandler import (
     TISPacket,
@@ -10,6 +10,16 @@ from TISControlProtocol.Protocols.udp.ProtocolHandler import (
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
 from . import TISConfigEntry
+from .dispatcher import async_subscribe_feedback
+from .feedback import SecurityFeedback
+from .scheduler import (
+    async_request_update,
+    async_send,
+    async_send_with_ack,
+    command_priority,
+)
+from .snapshot import async_restore_entity, async_save_entity
+from .state_writer import async_write_state
 
 import logging
 
@@ -25,7 +35,7 @@ async def async_setup_entry(
     """Set up the TIS select."""
     tis_api: TISApi = entry.runtime_data.api
     # Fetch all switches from the TIS API
-    selects: dict = await tis_api.get_entities(platform="security")
+    selects: dict = entry.runtime_data.catalog.entities("security")
 
     if selects:
         # Prepare a list of tuples containing necessary switch details
@@ -80,33 +90,45 @@ class TISSecurity(SelectEntity):
 
     async def async_added_to_hass(self) -> None:
         @callback
-        async def handle_event(event: Event):
+        async def handle_admin_lock(event: Event):
             """Handle a admin lock status change event."""
-            if event.event_type == "admin_lock":
-                logging.info(f"admin lock event: {event.data}")
-                if event.data.get("locked"):
-                    self.protect()
-                else:
-                    self.unprotect()
-
-            if (
-                event.data.get("feedback_type") == "security_feedback"
-                or event.data.get("feedback_type") == "security_update"
-            ):
-                logging.info(f"security feedback event: {event.data}")
-                if (
-                    self.channel_number == event.data["channel_number"]
-                    and self.device_id == event.data["device_id"]
-                ):
-                    mode = event.data["mode"]
-                    if mode in SECURITY_FEEDBACK_OPTIONS:
-                        option = SECURITY_FEEDBACK_OPTIONS[mode]
-                        logging.info(f"mode: {mode}, option: {option}")
-                        self._state = self._attr_current_option = option
-            self.async_write_ha_state()
+            logging.info(f"admin lock event: {event.data}")
+            if event.data.get("locked"):
+                self.protect()
+            else:
+                self.unprotect()
+            async_write_state(self)
 
-        self._listener = self.hass.bus.async_listen(MATCH_ALL, handle_event)
-        await self.api.protocol.sender.send_packet(self.update_packet)
+        @callback
+        def handle_event(feedback: SecurityFeedback):
+            """Handle a security feedback."""
+            logging.info(f"security feedback: {feedback}")
+            mode = feedback.mode
+            if mode in SECURITY_FEEDBACK_OPTIONS:
+                option = SECURITY_FEEDBACK_OPTIONS[mode]
+                logging.info(f"mode: {mode}, option: {option}")
+                self._state = self._attr_current_option = option
+                async_save_entity(self, ("_attr_current_option",))
+            async_write_state(self)
+
+        # start from the mode saved by the last run until the module answers
+        if async_restore_entity(self, ("_attr_current_option",)):
+            self._state = self._attr_current_option
+        self.async_on_remove(
+            self.hass.bus.async_listen("admin_lock", handle_admin_lock)
+        )
+        self._listener = async_subscribe_feedback(
+            self,
+            self.device_id,
+            ("security_feedback", "security_update"),
+            handle_event,
+            self.channel_number,
+        )
+        self.platform.config_entry.async_create_background_task(
+            self.hass,
+            async_request_update(self, self.update_packet),
+            f"{self.entity_id} state",
+        )
         logging.info(f"update packet sent: {self.update_packet}")
         logging.info(f"listener added: {self._listener}")
 
@@ -138,7 +160,7 @@ class TISSecurity(SelectEntity):
                 # revert state to the current option
                 self._state = self._attr_current_option = STATE_UNAVAILABLE
                 logging.error("resetting state to last known state")
-                await self.api.protocol.sender.send_packet(self.update_packet)
+                await async_send(self, self.update_packet, command_priority(self))
                 self.async_write_ha_state()
                 raise ValueError("The security module is protected and read only")
             else:
@@ -149,9 +171,7 @@ class TISSecurity(SelectEntity):
                     control_packet = handler.generate_control_security_packet(
                         self, mode
                     )
-                    ack = await self.api.protocol.sender.send_packet_with_ack(
-                        control_packet
-                    )
+                    ack = await async_send_with_ack(self, control_packet)
                     logging.info(f"control_packet: {control_packet}")
                     logging.info(f"ack: {ack}")
                     if ack:
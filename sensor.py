@@ -8,7 +8,7 @@ from TISControlProtocol.api import TISApi
 from TISControlProtocol.Protocols.udp.ProtocolHandler import TISProtocolHandler
 
 from homeassistant.components.sensor import SensorEntity, UnitOfTemperature
-from homeassistant.core import Event, HomeAssistant, callback
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
 from homeassistant.helpers.event import async_track_time_interval
@@ -17,6 +17,16 @@ from . import TISConfigEntry
 from .coordinator import SensorUpdateCoordinator
 from .entities import BaseSensorEntity
 from .const import ENERGY_SENSOR_TYPES
+from .dispatcher import async_subscribe_feedback
+from .feedback import (
+    AnalogFeedback,
+    EnergyFeedback,
+    Feedback,
+    HealthFeedback,
+    MonthlyEnergyFeedback,
+    TempFeedback,
+)
+from .state_writer import async_write_state
 from datetime import datetime
 
 
@@ -37,7 +47,7 @@ async def async_setup_entry(
     await tis_api.get_bill_configs()
     tis_sensors = []
     for sensor_type, handler in RELEVANT_TYPES.items():
-        sensors: list[dict] = await tis_api.get_entities(platform=sensor_type)
+        sensors: list[dict] = entry.runtime_data.catalog.entities(sensor_type)
         if sensors and len(sensors) > 0:
             # exctract the data
             sensor_entities = [
@@ -242,16 +252,18 @@ class CoordinatedTemperatureSensor(BaseSensorEntity, SensorEntity):
         await super().async_added_to_hass()
 
         @callback
-        def handle_temperature_feedback(event: Event):
+        def handle_temperature_feedback(feedback: Feedback):
             """Handle the LUNA temperature update event."""
             try:
-                if event.data["feedback_type"] == "temp_feedback":
-                    self._state = event.data["temp"]
-                self.async_write_ha_state()
+                if isinstance(feedback, TempFeedback):
+                    self._state = feedback.temp
+                async_write_state(self)
             except Exception as e:
-                logging.error(f"event data error for temperature: {event.data}")
+                logging.error(f"feedback error for temperature: {feedback}")
 
-        self.hass.bus.async_listen(str(self.device_id), handle_temperature_feedback)
+        async_subscribe_feedback(
+            self, self.device_id, ("temp_feedback",), handle_temperature_feedback
+        )
 
     def _update_state(self, data):
         """Update the state based on the data."""
@@ -298,16 +310,18 @@ class CoordinatedLUXSensor(BaseSensorEntity, SensorEntity):
         await super().async_added_to_hass()
 
         @callback
-        def handle_health_feedback(event: Event):
+        def handle_health_feedback(feedback: Feedback):
             """Handle the lux update event."""
             try:
-                if event.data["feedback_type"] == "health_feedback":
-                    self._state = int(event.data["lux"])
-                self.async_write_ha_state()
+                if isinstance(feedback, HealthFeedback):
+                    self._state = int(feedback.lux)
+                async_write_state(self)
             except Exception as e:
-                logging.error(f"event data error for lux: {event.data}")
+                logging.error(f"feedback error for lux: {feedback}")
 
-        self.hass.bus.async_listen(str(self.device_id), handle_health_feedback)
+        async_subscribe_feedback(
+            self, self.device_id, ("health_feedback",), handle_health_feedback
+        )
 
     def _update_state(self, data):
         """Update the state based on the data."""
@@ -360,12 +374,12 @@ class CoordinatedAnalogSensor(BaseSensorEntity, SensorEntity):
         await super().async_added_to_hass()
 
         @callback
-        def handle_analog_feedback(event: Event):
+        def handle_analog_feedback(feedback: Feedback):
             """Handle the analog update event."""
             try:
-                if event.data["feedback_type"] == "analog_feedback":
+                if isinstance(feedback, AnalogFeedback):
                     # Map the analog to be within min and max
-                    value = float(event.data["analog"][self.channel_number - 1])
+                    value = float(feedback.analog[self.channel_number - 1])
                     normalized = (value - self.min) / (
                         self.max - self.min
                     )  # Normalize to 0–1
@@ -375,13 +389,15 @@ class CoordinatedAnalogSensor(BaseSensorEntity, SensorEntity):
                         + (self.max_capacity - self.min_capacity) * normalized
                     )
 
-                self.async_write_ha_state()
+                async_write_state(self)
             except Exception as e:
                 logging.error(
-                    f"event data error for analog sensor: {event.data} \n error: {e}"
+                    f"feedback error for analog sensor: {feedback} \n error: {e}"
                 )
 
-        self.hass.bus.async_listen(str(self.device_id), handle_analog_feedback)
+        async_subscribe_feedback(
+            self, self.device_id, ("analog_feedback",), handle_analog_feedback
+        )
 
     def _update_state(self, data):
         """Update the state based on the data."""
@@ -471,57 +487,67 @@ class CoordinatedEnergySensor(BaseSensorEntity, SensorEntity):
         await super().async_added_to_hass()
 
         @callback
-        def handle_energy_feedback(event: Event):
+        def handle_energy_feedback(feedback: Feedback):
             """Handle the energy update event."""
+            apply = self._FEEDBACK_HANDLERS.get((type(feedback), self.sensor_type))
+            if apply is None or feedback.channel != self.channel_number:
+                return
             try:
-                if (
-                    event.data["feedback_type"] == "energy_feedback"
-                    and self.sensor_type == "energy_sensor"
-                ):
-                    if event.data["channel_num"] == self.channel_number:
-                        self._state = float(event.data["energy"].get(self._key, None))
-                elif (
-                    event.data["feedback_type"] == "monthly_energy_feedback"
-                    and self.sensor_type == "monthly_energy_sensor"
-                ):
-                    if event.data["channel_num"] == self.channel_number:
-                        self._state = event.data["energy"]
-                elif (
-                    event.data["feedback_type"] == "monthly_energy_feedback"
-                    and self.sensor_type == "bill_energy_sensor"
-                ):
-                    if event.data["channel_num"] == self.channel_number:
-                        month = datetime.now().month
-                        is_summer = month in [6, 7, 8, 9]
-
-                        rates = (
-                            self.api.bill_configs.get("summer_rates", {})
-                            if is_summer
-                            else self.api.bill_configs.get("winter_rates", {})
-                        )
-
-                        power_consumption = event.data["energy"]
-
-                        tier = None
-                        for index, rate in enumerate(rates):
-                            if power_consumption < rate["min_kw"]:
-                                tier = rates[index - 1]["price_per_kw"]
-                                break
-                        if tier is None and len(rates) > 0:
-                            tier = rates[-1]["price_per_kw"]
-
-                        self._state = int(tier * power_consumption)
-
-                self.async_write_ha_state()
+                apply(self, feedback)
+                async_write_state(self)
             except Exception as e:
                 logging.error(
                     f"error in self.name: {self.name}, self._key: {self._key}, self.sensor_type: {self.sensor_type}"
                 )
                 logging.error(
-                    f"event data error for energy sensor: {event.data} \n error: {e}"
+                    f"feedback error for energy sensor: {feedback} \n error: {e}"
                 )
 
-        self.hass.bus.async_listen(str(self.device_id), handle_energy_feedback)
+        async_subscribe_feedback(
+            self,
+            self.device_id,
+            ("energy_feedback", "monthly_energy_feedback"),
+            handle_energy_feedback,
+            self.channel_number,
+        )
+
+    def _apply_energy(self, feedback: EnergyFeedback) -> None:
+        """Apply the live reading of this sensor's key."""
+        self._state = float(feedback.energy.get(self._key, None))
+
+    def _apply_monthly_energy(self, feedback: MonthlyEnergyFeedback) -> None:
+        """Apply the consumption of this month."""
+        self._state = feedback.energy
+
+    def _apply_bill(self, feedback: MonthlyEnergyFeedback) -> None:
+        """Apply the bill of the consumption of this month."""
+        month = datetime.now().month
+        is_summer = month in [6, 7, 8, 9]
+
+        rates = (
+            self.api.bill_configs.get("summer_rates", {})
+            if is_summer
+            else self.api.bill_configs.get("winter_rates", {})
+        )
+
+        power_consumption = feedback.energy
+
+        tier = None
+        for index, rate in enumerate(rates):
+            if power_consumption < rate["min_kw"]:
+                tier = rates[index - 1]["price_per_kw"]
+                break
+        if tier is None and len(rates) > 0:
+            tier = rates[-1]["price_per_kw"]
+
+        self._state = int(tier * power_consumption)
+
+    # (feedback record, sensor_type) -> state it updates
+    _FEEDBACK_HANDLERS = {
+        (EnergyFeedback, "energy_sensor"): _apply_energy,
+        (MonthlyEnergyFeedback, "monthly_energy_sensor"): _apply_monthly_energy,
+        (MonthlyEnergyFeedback, "bill_energy_sensor"): _apply_bill,
+    }
 
     def _update_state(self, data):
         """Update the state based on the data."""
@@ -0,0 +1,165 @@
+"""Services of the TIS Control integration."""
+
+from __future__ import annotations
+
+import asyncio
+from collections import defaultdict
+import logging
+from typing import Any
+
+import voluptuous as vol
+
+from homeassistant.const import ATTR_ENTITY_ID, Platform
+from homeassistant.core import (
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
+    callback,
+)
+from homeassistant.helpers import entity_platform, service
+import homeassistant.helpers.config_validation as cv
+from homeassistant.helpers.entity import Entity
+
+from .channels import BROADCAST_CHANNEL
+from .commands import async_send_channel_levels, async_set_all_channels
+from .const import ATTR_LEVEL, DOMAIN, SERVICE_BULK_COMMAND, SERVICE_SET_ALL_CHANNELS
+
+_LOGGER = logging.getLogger(__name__)
+
+SET_ALL_CHANNELS_SCHEMA = cv.make_entity_service_schema(
+    {vol.Required(ATTR_LEVEL): vol.All(vol.Coerce(int), vol.Range(min=0, max=100))}
+)
+BULK_COMMAND_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_ENTITY_ID): cv.entity_ids,
+        vol.Required(ATTR_LEVEL): vol.All(vol.Coerce(int), vol.Range(min=0, max=100)),
+    }
+)
+# platforms whose entities control a single channel of a device
+CHANNEL_PLATFORMS = (Platform.LIGHT, Platform.SWITCH)
+
+
+@callback
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the services of the integration."""
+
+    async def async_handle_set_all_channels(call: ServiceCall) -> None:
+        await async_set_targeted_devices(hass, call.data[ATTR_LEVEL], call)
+
+    async def async_handle_bulk_command(call: ServiceCall) -> ServiceResponse:
+        return await async_bulk_command(
+            hass, call.data[ATTR_ENTITY_ID], call.data[ATTR_LEVEL], call
+        )
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_SET_ALL_CHANNELS,
+        async_handle_set_all_channels,
+        schema=SET_ALL_CHANNELS_SCHEMA,
+    )
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_BULK_COMMAND,
+        async_handle_bulk_command,
+        schema=BULK_COMMAND_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+
+
+def _channel_entities(hass: HomeAssistant) -> dict[str, Entity]:
+    """Return the single channel entities of every config entry by entity id."""
+    return {
+        entity_id: entity
+        for platform in entity_platform.async_get_platforms(hass, DOMAIN)
+        if platform.domain in CHANNEL_PLATFORMS
+        for entity_id, entity in platform.entities.items()
+        if hasattr(entity, "channel_number")
+    }
+
+
+async def _async_set_device_channels(
+    channels: dict[int, list[Entity]], level: int
+) -> dict[int, bool]:
+    """Set the given channels of one device to a level."""
+    entity = next(iter(channels.values()))[0]
+    if BROADCAST_CHANNEL in channels:
+        # the all channels entity covers every other channel of the device
+        ack = await async_set_all_channels(entity, level)
+        return dict.fromkeys(channels, ack)
+    return await async_send_channel_levels(entity, dict.fromkeys(channels, level))
+
+
+async def async_set_targeted_devices(
+    hass: HomeAssistant, level: int, call: ServiceCall
+) -> None:
+    """Set every channel of the devices of the targeted lights and switches.
+
+    Each device gets a single broadcast frame, however many of its
+    entities are targeted.
+    """
+    entities = await service.async_extract_entities(
+        _channel_entities(hass).values(), call
+    )
+    devices: dict[tuple[str, tuple[int, ...]], Entity] = {}
+    for entity in entities:
+        entity.async_set_context(call.context)
+        devices.setdefault((entity.gateway, tuple(entity.device_id)), entity)
+    await asyncio.gather(
+        *(async_set_all_channels(entity, level) for entity in devices.values())
+    )
+
+
+async def async_bulk_command(
+    hass: HomeAssistant, entity_ids: list[str], level: int, call: ServiceCall
+) -> dict[str, Any]:
+    """Set the channels of many entities to a level in as few frames as possible.
+
+    Entities are grouped by gateway and device. The channels of a device
+    are sent together and collapse into one broadcast frame when they
+    cover the whole device. Devices are sent concurrently, the queue of
+    each gateway paces its own frames so gateways run in parallel.
+    Returns the ack of every entity and the wall time of the command.
+    """
+    started = hass.loop.time()
+    entities = _channel_entities(hass)
+    results: dict[str, dict[str, Any]] = {}
+    devices: dict[tuple[str, tuple[int, ...]], dict[int, list[Entity]]] = defaultdict(
+        lambda: defaultdict(list)
+    )
+    for entity_id in entity_ids:
+        entity = entities.get(entity_id)
+        if entity is None:
+            results[entity_id] = {"error": "not a TIS channel entity"}
+            continue
+        entity.async_set_context(call.context)
+        devices[(entity.gateway, tuple(entity.device_id))][
+            entity.channel_number
+        ].append(entity)
+
+    acks = await asyncio.gather(
+        *(_async_set_device_channels(channels, level) for channels in devices.values()),
+        return_exceptions=True,
+    )
+    for ((gateway, device_id), channels), device_acks in zip(
+        devices.items(), acks, strict=True
+    ):
+        if isinstance(device_acks, BaseException):
+            _LOGGER.error(
+                "Error in bulk command, device: %s: %s", device_id, device_acks
+            )
+            device_acks = dict.fromkeys(channels, False)
+        for channel, channel_entities in channels.items():
+            for entity in channel_entities:
+                results[entity.entity_id] = {
+                    "gateway": gateway,
+                    "device_id": list(device_id),
+                    "channel": channel,
+                    "ack": device_acks[channel],
+                }
+    return {
+        "results": results,
+        "devices": len(devices),
+        "wall_time": hass.loop.time() - started,
+    }
@@ -0,0 +1,118 @@
+"""Snapshot of the last known TIS states, restored after a restart."""
+
+from __future__ import annotations
+
+from collections.abc import Iterable
+from types import MappingProxyType
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.entity import Entity
+from homeassistant.helpers.storage import Store
+
+from .channels import ChannelStateStore
+from .const import DOMAIN
+
+STORAGE_VERSION = 1
+# seconds, the snapshot is written at most once per delay
+SNAPSHOT_SAVE_DELAY = 30
+# extra state attributes of an entity showing its restored state
+RESTORED_ATTRIBUTES = MappingProxyType({"restored": True})
+
+
+class StateSnapshot:
+    """Last known channel levels and entity states, kept in Home Assistant storage.
+
+    After a restart the channel state store and the entities start from the
+    snapshot, marked restored, until live feedback replaces their state.
+    Changes are written at most once per SNAPSHOT_SAVE_DELAY so a busy bus
+    does not wear out the storage.
+    """
+
+    def __init__(
+        self, hass: HomeAssistant, entry_id: str, channel_states: ChannelStateStore
+    ) -> None:
+        """Initialize the snapshot."""
+        self.channel_states = channel_states
+        self._store: Store[dict[str, Any]] = Store(
+            hass, STORAGE_VERSION, f"{DOMAIN}.{entry_id}.snapshot"
+        )
+        # saved attributes of entities without a channel, by unique id
+        self._entities: dict[str, dict[str, Any]] = {}
+        self._save_scheduled = False
+        self.saves = 0
+        channel_states.on_change = self.async_schedule_save
+
+    async def async_load(self) -> None:
+        """Restore the channel levels and entity states of the last run."""
+        data = await self._store.async_load()
+        if not data:
+            return
+        for device, levels in data.get("channels", {}).items():
+            self.channel_states.restore(
+                tuple(int(n) for n in device.split(",")), bytes.fromhex(levels)
+            )
+        self._entities = data.get("entities", {})
+
+    def entity_state(self, unique_id: str) -> dict[str, Any] | None:
+        """Return the saved attributes of an entity."""
+        return self._entities.get(unique_id)
+
+    @callback
+    def async_set_entity_state(self, unique_id: str, state: dict[str, Any]) -> None:
+        """Save the attributes of an entity with the next write."""
+        if self._entities.get(unique_id) != state:
+            self._entities[unique_id] = state
+            self.async_schedule_save()
+
+    @callback
+    def async_schedule_save(self) -> None:
+        """Write the snapshot once the save delay passed."""
+        if not self._save_scheduled:
+            self._save_scheduled = True
+            self._store.async_delay_save(self._data_to_save, SNAPSHOT_SAVE_DELAY)
+
+    async def async_save(self) -> None:
+        """Write the snapshot now."""
+        await self._store.async_save(self._data_to_save())
+
+    def _data_to_save(self) -> dict[str, Any]:
+        self._save_scheduled = False
+        self.saves += 1
+        return {
+            "channels": self.channel_states.as_snapshot(),
+            "entities": self._entities,
+        }
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the snapshot statistics."""
+        return {
+            "devices": len(self.channel_states.as_snapshot()),
+            "entities": len(self._entities),
+            "restored_devices": len(self.channel_states.restored_devices),
+            "saves": self.saves,
+        }
+
+
+@callback
+def async_restore_entity(entity: Entity, names: Iterable[str]) -> bool:
+    """Set the saved attributes of an entity, return whether there were any."""
+    snapshot: StateSnapshot = entity.platform.config_entry.runtime_data.snapshot
+    state = snapshot.entity_state(entity.unique_id)
+    if state is None:
+        return False
+    for name in names:
+        if name in state:
+            setattr(entity, name, state[name])
+    entity._attr_extra_state_attributes = RESTORED_ATTRIBUTES
+    return True
+
+
+@callback
+def async_save_entity(entity: Entity, names: Iterable[str]) -> None:
+    """Save the given attributes of an entity in the snapshot."""
+    snapshot: StateSnapshot = entity.platform.config_entry.runtime_data.snapshot
+    snapshot.async_set_entity_state(
+        entity.unique_id, {name: getattr(entity, name) for name in names}
+    )
+    entity._attr_extra_state_attributes = None
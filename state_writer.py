@@ -0,0 +1,135 @@
+"""Coalesced and change detected state writes for TIS Control entities."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from weakref import WeakKeyDictionary
+
+from homeassistant.core import HomeAssistant, State, callback
+from homeassistant.helpers.entity import Entity
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def _state_key(entity: Entity) -> tuple:
+    """Return what a state write of the entity would publish."""
+    return (
+        entity.available,
+        entity.state,
+        entity.state_attributes,
+        entity.extra_state_attributes,
+    )
+
+
+class StateWriteCoalescer:
+    """Collect state writes of a feedback burst and flush them together.
+
+    Entities are marked dirty and written once when the flush window ends,
+    a window of 0 flushes on the next event loop iteration. Writes that
+    would publish the same state and attributes as the previous write of
+    the entity are skipped.
+    """
+
+    def __init__(self, hass: HomeAssistant, window: float = 0) -> None:
+        """Initialize the coalescer, window is in seconds."""
+        self.hass = hass
+        self.window = window
+        self._dirty: dict[int, Entity] = {}
+        self._flush_handle: asyncio.Handle | asyncio.TimerHandle | None = None
+        # last written key and the State it produced, per entity
+        self._last_writes: WeakKeyDictionary[Entity, tuple[tuple, State | None]] = (
+            WeakKeyDictionary()
+        )
+        self.requested_writes = 0
+        self.flushed_writes = 0
+        self.flushes = 0
+        self.last_flush_size = 0
+        self.max_flush_size = 0
+        self.state_writes = 0
+        self.skipped_writes = 0
+
+    @callback
+    def async_schedule_write(self, entity: Entity) -> None:
+        """Mark an entity dirty, its state is written on the next flush."""
+        self.requested_writes += 1
+        self._dirty[id(entity)] = entity
+        if self._flush_handle is None:
+            if self.window > 0:
+                self._flush_handle = self.hass.loop.call_later(
+                    self.window, self._async_flush
+                )
+            else:
+                self._flush_handle = self.hass.loop.call_soon(self._async_flush)
+
+    @callback
+    def async_write_if_changed(self, entity: Entity) -> bool:
+        """Write the state of an entity unless it did not change."""
+        if entity.hass is None:
+            return False
+        key = _state_key(entity)
+        last = self._last_writes.get(entity)
+        # the State check catches writes made directly by the entity since
+        if (
+            last is not None
+            and last[0] == key
+            and last[1] is self.hass.states.get(entity.entity_id)
+        ):
+            self.skipped_writes += 1
+            return False
+        self.state_writes += 1
+        entity.async_write_ha_state()
+        self._last_writes[entity] = (key, self.hass.states.get(entity.entity_id))
+        return True
+
+    @callback
+    def _async_flush(self) -> None:
+        """Write the state of every dirty entity."""
+        self._flush_handle = None
+        dirty, self._dirty = self._dirty, {}
+        for entity in dirty.values():
+            self.async_write_if_changed(entity)
+        self.flushes += 1
+        self.flushed_writes += len(dirty)
+        self.last_flush_size = len(dirty)
+        self.max_flush_size = max(self.max_flush_size, len(dirty))
+        _LOGGER.debug("Flushed %d coalesced state writes", len(dirty))
+
+    @callback
+    def async_stop(self) -> None:
+        """Drop pending writes, the entities are being removed."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        self._dirty.clear()
+
+    def as_dict(self) -> dict:
+        """Return the write statistics."""
+        return {
+            "window": self.window,
+            "requested_writes": self.requested_writes,
+            "flushed_writes": self.flushed_writes,
+            "flushes": self.flushes,
+            "last_flush_size": self.last_flush_size,
+            "max_flush_size": self.max_flush_size,
+            "state_writes": self.state_writes,
+            "skipped_writes": self.skipped_writes,
+        }
+
+
+@callback
+def async_schedule_write(entity: Entity) -> None:
+    """Schedule a coalesced state write for an entity."""
+    state_writer: StateWriteCoalescer = (
+        entity.platform.config_entry.runtime_data.state_writer
+    )
+    state_writer.async_schedule_write(entity)
+
+
+@callback
+def async_write_state(entity: Entity) -> bool:
+    """Write the state of an entity now unless it did not change."""
+    state_writer: StateWriteCoalescer = (
+        entity.platform.config_entry.runtime_data.state_writer
+    )
+    return state_writer.async_write_if_changed(entity)
@@ -3,10 +3,8 @@
 from __future__ import annotations
 
 from collections.abc import Callable
-from math import ceil
 from typing import Any
 
-from TISControlProtocol.BytesHelper import int_to_8_bit_binary
 from TISControlProtocol.api import TISApi
 from TISControlProtocol.Protocols.udp.ProtocolHandler import (
     TISPacket,
@@ -14,13 +12,38 @@ from TISControlProtocol.Protocols.udp.ProtocolHandler import (
 )
 
 from homeassistant.components.switch import SwitchEntity
-from homeassistant.const import MATCH_ALL, STATE_OFF, STATE_ON, STATE_UNKNOWN, Platform
-from homeassistant.core import Event, HomeAssistant, callback
+from homeassistant.const import STATE_OFF, STATE_ON, STATE_UNKNOWN, Platform
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 import logging
 
 
 from . import TISConfigEntry
+from .channels import (
+    BROADCAST_CHANNEL,
+    ChannelStateStore,
+    all_channels_devices,
+    all_channels_name,
+)
+from .dispatcher import async_subscribe_feedback
+from .feedback import (
+    BinaryFeedback,
+    ControlResponse,
+    Feedback,
+    OfflineDevice,
+    UpdateResponse,
+)
+from .scheduler import async_request_update, async_send_with_ack
+from .snapshot import RESTORED_ATTRIBUTES
+from .state_writer import async_schedule_write
+
+FEEDBACK_TYPES = (
+    "control_response",
+    "binary_feedback",
+    "update_response",
+)
+# feedback carrying the state of every channel of the device
+BULK_FEEDBACK = (BinaryFeedback, UpdateResponse)
 
 
 async def async_setup_entry(
@@ -30,7 +53,7 @@ async def async_setup_entry(
     tis_api: TISApi = entry.runtime_data.api
 
     # Fetch all switches from the TIS API we only have one type here
-    switches: dict = await tis_api.get_entities(platform=Platform.SWITCH)
+    switches: dict = entry.runtime_data.catalog.entities(Platform.SWITCH)
     if switches:
         # Prepare a list of tuples containing necessary switch details
         switch_entities = [
@@ -51,6 +74,20 @@ async def async_setup_entry(
                 TISSwitch(tis_api, switch_name, channel_number, device_id, gateway)
                 for switch_name, channel_number, device_id, is_protected, gateway in switch_entities
             ]
+            # one switch per device setting all of its channels in a single frame
+            tis_switches.extend(
+                TISSwitch(
+                    tis_api,
+                    all_channels_name(device_id),
+                    BROADCAST_CHANNEL,
+                    list(device_id),
+                    gateway,
+                )
+                for device_id, gateway in all_channels_devices(
+                    (device_id, gateway, channel_number)
+                    for _, channel_number, device_id, _, gateway in switch_entities
+                ).items()
+            )
             async_add_devices(tis_switches, update_before_add=True)
         except Exception as e:
             logging.error(f"error happened creating entities e: {e}")
@@ -81,7 +118,8 @@ class TISSwitch(SwitchEntity):
         self.gateway = gateway
         self.channel_number = int(channel_number)
         self.listener: Callable | None = None
-        self.broadcast_channel = 255
+        self.channel_states: ChannelStateStore | None = None
+        self.broadcast_channel = BROADCAST_CHANNEL
         self.on_packet: TISPacket = protocol_handler.generate_control_on_packet(self)
         self.off_packet: TISPacket = protocol_handler.generate_control_off_packet(self)
         self.update_packet: TISPacket = protocol_handler.generate_control_update_packet(
@@ -91,44 +129,60 @@ class TISSwitch(SwitchEntity):
     async def async_added_to_hass(self) -> None:
         """Subscribe to events."""
 
+        broadcast = self.channel_number == self.broadcast_channel
+
+        def level() -> int | None:
+            if broadcast:
+                # on while any channel of the device is
+                return self.channel_states.max_level(self.device_id)
+            return self.channel_states.get(self.device_id, self.channel_number)
+
         @callback
-        async def handle_event(event: Event):
-            """Handle the event."""
-            # check if event is for this switch
-            if event.event_type == str(self.device_id):
-                if event.data["feedback_type"] == "control_response":
-                    channel_value = event.data["additional_bytes"][2]
-                    channel_number = event.data["channel_number"]
-                    if int(channel_number) == self.channel_number:
-                        self._state = (
-                            STATE_ON if int(channel_value) == 100 else STATE_OFF
-                        )
-                elif self.channel_number != self.broadcast_channel:
-                    if event.data["feedback_type"] == "binary_feedback":
-                        n_bytes = ceil(event.data["additional_bytes"][0] / 8)
-                        channels_status = "".join(
-                            int_to_8_bit_binary(event.data["additional_bytes"][i])
-                            for i in range(1, n_bytes + 1)
-                        )
-                        self._state = (
-                            STATE_ON
-                            if channels_status[self.channel_number - 1] == "1"
-                            else STATE_OFF
-                        )
-                    elif event.data["feedback_type"] == "update_response":
-                        additional_bytes = event.data["additional_bytes"]
-                        channel_status = int(additional_bytes[self.channel_number])
-                        self._state = STATE_ON if channel_status > 0 else STATE_OFF
-                elif event.data["feedback_type"] == "offline_device":
-                    if int(event.data["channel_number"]) == self.channel_number:
-                        self._state = STATE_UNKNOWN
-
-            await self.async_update_ha_state(True)
-            # self.schedule_update_ha_state()
+        def handle_event(feedback: Feedback):
+            """Handle the feedback."""
+            if isinstance(feedback, OfflineDevice):
+                self._state = STATE_UNKNOWN
+            elif isinstance(feedback, ControlResponse) and not broadcast:
+                self._state = STATE_ON if level() == 100 else STATE_OFF
+            elif (broadcast or isinstance(feedback, BULK_FEEDBACK)) and (
+                channel_level := level()
+            ) is not None:
+                self._state = STATE_ON if channel_level > 0 else STATE_OFF
+            self._attr_extra_state_attributes = None
+
+            async_schedule_write(self)
 
         try:
-            self.listener = self.hass.bus.async_listen(MATCH_ALL, handle_event)
-            _ = await self.api.protocol.sender.send_packet(self.update_packet)
+            self.channel_states = self.platform.config_entry.runtime_data.channel_states
+            self.channel_states.register(self.device_id, self.channel_number)
+            # start from the level saved by the last run until the device answers
+            if self.channel_states.is_restored(self.device_id) and (
+                channel_level := level()
+            ) is not None:
+                self._state = STATE_ON if channel_level > 0 else STATE_OFF
+                self._attr_extra_state_attributes = RESTORED_ATTRIBUTES
+            self.listener = async_subscribe_feedback(
+                self,
+                self.device_id,
+                FEEDBACK_TYPES,
+                handle_event,
+                # the broadcast channel follows the feedback of every channel
+                None if broadcast else self.channel_number,
+            )
+            if broadcast:
+                # only the all channels switch goes unknown when a command fails
+                async_subscribe_feedback(
+                    self,
+                    self.device_id,
+                    ("offline_device",),
+                    handle_event,
+                    self.channel_number,
+                )
+            self.platform.config_entry.async_create_background_task(
+                self.hass,
+                async_request_update(self, self.update_packet),
+                f"{self.entity_id} state",
+            )
         except Exception as e:
             logging.error(f"error in async_added_to_hass fun e: {e}")
 
@@ -140,9 +194,7 @@ class TISSwitch(SwitchEntity):
         """Turn the switch on."""
 
         try:
-            ack_status = await self.api.protocol.sender.send_packet_with_ack(
-                self.on_packet,
-            )
+            ack_status = await async_send_with_ack(self, self.on_packet)
             if ack_status:
                 self._state = STATE_ON
             elif ack_status == False:
@@ -161,9 +213,7 @@ class TISSwitch(SwitchEntity):
         """Turn the switch off."""
 
         try:
-            ack_status = await self.api.protocol.sender.send_packet_with_ack(
-                self.off_packet
-            )
+            ack_status = await async_send_with_ack(self, self.off_packet)
             if ack_status:
                 self._state = STATE_OFF
             elif ack_status == False:
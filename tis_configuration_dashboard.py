@@ -2,44 +2,34 @@ import os
 from ruamel.yaml import YAML
 import logging
 
+DASHBOARD_FILENAME = "tis_configuration.yaml"
 
-# ------ Security Settings Setup
-def create():
-    current_dir = os.path.dirname(__file__)
-    base_dir = os.path.abspath(os.path.join(current_dir, "../../"))
-    config_path = os.path.join(base_dir, "configuration.yaml")
-    dashboard_filename = "tis_configuration.yaml"
-    dashboard_path = os.path.join(base_dir, dashboard_filename)
-    try:
-        # YAML setup
-        yaml = YAML()
-        yaml.preserve_quotes = True
-
-        # 1. Load configuration.yaml
-        with open(config_path, "r") as f:
-            config = yaml.load(f)
 
-        # 2. Add dashboard if missing
-        if "lovelace" not in config:
-            config["lovelace"] = {}
-        if "dashboards" not in config["lovelace"]:
-            config["lovelace"]["dashboards"] = {}
+# ------ Security Settings Setup
+def add_dashboard(config) -> bool:
+    """Add the dashboard to a parsed configuration.yaml, return if it was missing."""
+    if "lovelace" not in config:
+        config["lovelace"] = {}
+    if "dashboards" not in config["lovelace"]:
+        config["lovelace"]["dashboards"] = {}
 
-        if "tis-configuration" not in config["lovelace"]["dashboards"]:
-            config["lovelace"]["dashboards"]["tis-configuration"] = {
-                "mode": "yaml",
-                "title": "TIS Configuration",
-                "icon": "mdi:tune",
-                "show_in_sidebar": True,
-                "filename": dashboard_filename,
-                "require_admin": True,
-            }
+    if "tis-configuration" in config["lovelace"]["dashboards"]:
+        return False
+    config["lovelace"]["dashboards"]["tis-configuration"] = {
+        "mode": "yaml",
+        "title": "TIS Configuration",
+        "icon": "mdi:tune",
+        "show_in_sidebar": True,
+        "filename": DASHBOARD_FILENAME,
+        "require_admin": True,
+    }
+    return True
 
-        # 3. Save configuration.yaml
-        with open(config_path, "w") as f:
-            yaml.dump(config, f)
 
-        # 4. Create dashboard file if not exists
+def create(base_dir: str, yaml: YAML) -> None:
+    """Create the dashboard file if it does not exist."""
+    dashboard_path = os.path.join(base_dir, DASHBOARD_FILENAME)
+    try:
         if not os.path.exists(dashboard_path):
             dashboard_content = {
                 "title": "YAML Dashboard",
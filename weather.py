@@ -35,7 +35,6 @@ from homeassistant.components.weather import (
 )
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import (
-    MATCH_ALL,
     CONF_LATITUDE,
     CONF_LONGITUDE,
     CONF_NAME,
@@ -46,11 +45,15 @@ from homeassistant.const import (
     UnitOfSpeed,
     UnitOfTemperature,
 )
-from homeassistant.core import Event, HomeAssistant, callback
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.helpers.event import async_track_time_interval
 
 from . import TISConfigEntry
+from .dispatcher import async_subscribe_feedback
+from .feedback import Feedback
+from .scheduler import PRIORITY_POLLING, async_send
+from .state_writer import async_write_state
 
 handler = TISProtocolHandler()
 
@@ -89,25 +92,26 @@ class TISWeatherStation(WeatherEntity):
         """Register callbacks for handling update events."""
 
         @callback
-        def handle_event(event: Event):
-            if event.event_type == str(self.device_id):
-                if event.data["feedback_type"] == "weather_feedback":
-                    #     """
-                    #             "wind": wind_direction,
-                    #             "temperature": temperature,
-                    #             "humidity": humidity,
-                    #             "wind_speed": wind_speed,
-                    #             "gust_speed": gust_speed,
-                    #             "rainfall": rainfall,
-                    #             "lighting": lighting,
-                    #             "uv": uv,"""
-                    # update attributes
-                    self._attr_uv_index = float(event.data["uv"])
-                    self._attr_native_temperature = event.data["temperature"]
-                    logging.info(f"event data {event.data}")
-            self.schedule_update_ha_state()
-
-        self.listener = self.hass.bus.async_listen(MATCH_ALL, handle_event)
+        def handle_event(feedback: Feedback):
+            #     """
+            #             "wind": wind_direction,
+            #             "temperature": temperature,
+            #             "humidity": humidity,
+            #             "wind_speed": wind_speed,
+            #             "gust_speed": gust_speed,
+            #             "rainfall": rainfall,
+            #             "lighting": lighting,
+            #             "uv": uv,"""
+            # update attributes
+            data = feedback.event.data
+            self._attr_uv_index = float(data["uv"])
+            self._attr_native_temperature = data["temperature"]
+            logging.info(f"event data {data}")
+            async_write_state(self)
+
+        self.listener = async_subscribe_feedback(
+            self, self.device_id, ("weather_feedback",), handle_event
+        )
 
     async def async_will_remove_from_hass(self) -> None:
         """Remove the listener when the entity is removed."""
@@ -117,7 +121,7 @@ class TISWeatherStation(WeatherEntity):
 
     async def async_update(self, *args, **kwargs) -> None:
         """Get the latest data from Buienradar."""
-        await self.api.protocol.sender.send_packet(self.update_packet)
+        await async_send(self, self.update_packet, PRIORITY_POLLING)
 
     @property
     def name(self) -> str: